@@ -0,0 +1,108 @@
+from panda3d.core import GeomNode, NodePath
+
+
+DEFAULT_PARTICLE_MODEL = "misc/sphere"  # Panda3D's default sphere model
+ASSET_TASK_CHAIN = "asset_loading"
+
+
+class AssetManager:
+    """Preloads particle models and textures and shares one flattened geometry per particle type.
+
+    Every particle type gets a prototype NodePath holding a single GeomNode.
+    Particles instance that node instead of copying a freshly loaded model, so
+    spawning is cheap, and swapping the geometry of a prototype updates every
+    particle of that type at once.
+    """
+
+    def __init__(self, loader, task_mgr, particle_types, on_change=None):
+        self.loader = loader
+        self.task_mgr = task_mgr
+        self.on_change = on_change  # Called with a type name after its geometry or texture changes
+        self.prototypes = {}  # Type name -> NodePath of the shared GeomNode
+        self.textures = {}  # Type name -> loaded Texture
+        self.pending = set()  # (kind, type name) of loads still in flight
+
+        # Textures have no asynchronous loader API, so they load on a worker thread
+        self.task_mgr.setupTaskChain(ASSET_TASK_CHAIN, numThreads=1)
+
+        self.preload(particle_types)
+
+    def preload(self, particle_types):
+        """Start asynchronous loads for every particle type's model and texture."""
+        for type_name, props in particle_types.items():
+            self.load_model(type_name, props.get("model", DEFAULT_PARTICLE_MODEL))
+            if props.get("texture"):
+                self.load_texture(type_name, props["texture"])
+
+    def is_ready(self):
+        """Return True once no model or texture loads are pending."""
+        return not self.pending
+
+    def get_prototype(self, type_name):
+        """Return the shared prototype NodePath for a particle type, creating it if needed."""
+        prototype = self.prototypes.get(type_name)
+        if prototype is None:
+            prototype = NodePath(GeomNode(f"{type_name}_geom"))
+            self.prototypes[type_name] = prototype
+        return prototype
+
+    def instance(self, type_name, parent):
+        """Attach an instance of the type's shared geometry below parent."""
+        return self.get_prototype(type_name).instanceTo(parent)
+
+    def load_model(self, type_name, model_path):
+        """Load model_path in the background and swap it in for type_name when done."""
+        self.get_prototype(type_name)
+        self.pending.add(("model", type_name))
+        self.loader.loadModel(model_path, okMissing=True,
+                              callback=self.on_model_loaded,
+                              extraArgs=[type_name, model_path])
+
+    def on_model_loaded(self, model, type_name, model_path):
+        """Flatten a loaded model and make its geometry the type's shared geometry."""
+        self.pending.discard(("model", type_name))
+        if model is None:
+            print(f"Could not load model '{model_path}' for particle type {type_name}")
+            return
+        self.set_geometry(type_name, model)
+
+    def set_geometry(self, type_name, model):
+        """Replace the shared geometry of a type with the flattened geometry of model."""
+        model.flattenStrong()
+        geom_node = self.get_prototype(type_name).node()
+        geom_node.removeAllGeoms()
+        for model_geom_np in model.findAllMatches("**/+GeomNode"):
+            net_state = model_geom_np.getNetState()
+            model_geom_node = model_geom_np.node()
+            for i in range(model_geom_node.getNumGeoms()):
+                state = net_state.compose(model_geom_node.getGeomState(i))
+                geom_node.addGeom(model_geom_node.modifyGeom(i), state)
+        self.notify_change(type_name)
+
+    def load_texture(self, type_name, texture_path):
+        """Load texture_path on the asset thread and apply it to the type's prototype."""
+        self.pending.add(("texture", type_name))
+        self.task_mgr.add(self.load_texture_task, f"load_texture_{type_name}",
+                          taskChain=ASSET_TASK_CHAIN,
+                          extraArgs=[type_name, texture_path])
+
+    def load_texture_task(self, type_name, texture_path):
+        """Runs on the asset thread; hands the texture back to the main thread."""
+        texture = self.loader.loadTexture(texture_path, okMissing=True)
+        self.task_mgr.add(self.on_texture_loaded, f"apply_texture_{type_name}",
+                          extraArgs=[texture, type_name, texture_path])
+
+    def on_texture_loaded(self, texture, type_name, texture_path):
+        """Apply a loaded texture to every particle of the type."""
+        self.pending.discard(("texture", type_name))
+        if texture is None:
+            print(f"Could not load texture '{texture_path}' for particle type {type_name}")
+            return
+        self.textures[type_name] = texture
+        self.get_prototype(type_name).setTexture(texture, 1)
+        self.notify_change(type_name)
+
+    def notify_change(self, type_name):
+        """Tell the owner that copies of a type's geometry need rebuilding."""
+        if self.on_change is not None:
+            self.on_change(type_name)
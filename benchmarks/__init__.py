@@ -0,0 +1 @@
+"""Performance benchmarks for the simulation and rendering hot paths."""
@@ -0,0 +1,94 @@
+"""
+Command line entry point for the benchmark suite.
+
+    python -m benchmarks                          # run and print results
+    python -m benchmarks --save                   # record a new baseline
+    python -m benchmarks --compare                # fail on regressions vs the baseline
+"""
+
+import argparse
+import os
+import sys
+
+from benchmarks.harness import (DEFAULT_NOISE_FLOOR_MS, DEFAULT_REPEATS, DEFAULT_TOLERANCE,
+                                best_of, compare, format_table, load_baseline, save_baseline)
+
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baselines", "baseline.json")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Primeval Atom hot paths.")
+    parser.add_argument("--full", action="store_true",
+                        help="sweep particle counts up to 10^6 (slow)")
+    parser.add_argument("--counts", type=int, nargs="+",
+                        help="explicit particle counts to sweep")
+    parser.add_argument("--grid-sizes", type=int, nargs="+",
+                        help="explicit grid sizes to sweep")
+    parser.add_argument("--no-render", action="store_true",
+                        help="skip the render_frame benchmarks")
+    parser.add_argument("--display", default="p3tinydisplay",
+                        help="Panda3D display module for the offscreen buffer")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE,
+                        help="baseline JSON file to save to or compare against")
+    parser.add_argument("--save", action="store_true",
+                        help="write the results as the new baseline")
+    parser.add_argument("--compare", action="store_true",
+                        help="compare against the baseline and exit non-zero on regressions")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed fractional slowdown before a regression is reported")
+    parser.add_argument("--noise-floor", type=float, default=DEFAULT_NOISE_FLOOR_MS,
+                        help="smallest slowdown in ms that is ever reported as a regression")
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS,
+                        help="suite runs to take the best of when saving or comparing")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    # Imported lazily so --help works without a display
+    from benchmarks import suite
+
+    if args.counts:
+        counts = args.counts
+    elif args.full:
+        counts = suite.FULL_PARTICLE_COUNTS
+    else:
+        counts = suite.DEFAULT_PARTICLE_COUNTS
+    grid_sizes = args.grid_sizes or suite.DEFAULT_GRID_SIZES
+
+    simulator = suite.create_headless_simulator(args.display)
+    # A single run is enough to look at; baselines and gates take the best of several
+    repeats = args.repeats if args.save or args.compare else 1
+    runs = []
+    for run in range(repeats):
+        if repeats > 1:
+            print(f"Suite run {run + 1} of {repeats}")
+        runs.append(suite.run_suite(simulator, counts, grid_sizes, render=not args.no_render))
+    results = best_of(runs)
+    print(format_table(results))
+
+    if args.compare:
+        if not os.path.exists(args.baseline):
+            print(f"No baseline found at {args.baseline}; run with --save first.")
+            return 1
+        regressions = compare(results, load_baseline(args.baseline), args.tolerance,
+                              noise_floor_ms=args.noise_floor)
+        if regressions:
+            print(f"\nPERFORMANCE REGRESSIONS ({len(regressions)}):")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("\nNo regressions against baseline.")
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        save_baseline(args.baseline, results, meta={"display": args.display})
+        print(f"Baseline saved to {args.baseline}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
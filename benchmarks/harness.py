@@ -0,0 +1,129 @@
+"""
+Timing, statistics and baseline helpers for the benchmark suite.
+Kept free of Panda3D imports so it can be unit tested on its own.
+"""
+
+import json
+import math
+import platform
+import sys
+import time
+
+
+DEFAULT_TOLERANCE = 0.25  # Allow 25% slowdown before flagging a regression
+DEFAULT_NOISE_FLOOR_MS = 0.05  # Never flag a slowdown smaller than this, however large relative to the baseline
+DEFAULT_REPEATS = 3  # Suite runs per --save or --compare; each benchmark keeps its best run
+COMPARED_METRICS = ("p50_ms",)  # Tail percentiles swing with machine load; only medians gate
+
+
+def percentile(samples, pct):
+    """Return the pct-th percentile of samples using linear interpolation."""
+    if not samples:
+        raise ValueError("Cannot compute a percentile of no samples")
+    ordered = sorted(samples)
+    rank = (len(ordered) - 1) * (pct / 100.0)
+    lower = math.floor(rank)
+    upper = math.ceil(rank)
+    if lower == upper:
+        return ordered[int(rank)]
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def measure(func, repeat, warmup=1):
+    """Call func warmup + repeat times and return the timed latencies in seconds."""
+    for _ in range(warmup):
+        func()
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def summarize(latencies, items_per_call=1):
+    """Reduce raw latencies (seconds) to latency percentiles and throughput."""
+    total = sum(latencies)
+    return {
+        "samples": len(latencies),
+        "items_per_call": items_per_call,
+        "mean_ms": total / len(latencies) * 1000.0,
+        "p50_ms": percentile(latencies, 50) * 1000.0,
+        "p95_ms": percentile(latencies, 95) * 1000.0,
+        "p99_ms": percentile(latencies, 99) * 1000.0,
+        "throughput_per_s": (items_per_call * len(latencies) / total) if total > 0 else float("inf"),
+    }
+
+
+def best_of(runs):
+    """Merge several suite runs, keeping each benchmark's result from the run with the lowest p50.
+
+    Noise on a shared machine only ever makes a run slower, so the fastest
+    of a few runs is a far steadier estimate than any single one.
+    """
+    merged = {}
+    for results in runs:
+        for name, result in results.items():
+            if name not in merged or result["p50_ms"] < merged[name]["p50_ms"]:
+                merged[name] = result
+    return merged
+
+
+def environment_info():
+    """Describe the machine a run was recorded on, stored alongside baselines."""
+    return {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+    }
+
+
+def save_baseline(path, results, meta=None):
+    """Write benchmark results to a JSON baseline file."""
+    payload = {"meta": dict(environment_info(), **(meta or {})), "results": results}
+    with open(path, "w") as f:
+        json.dump(payload, f, indent=2, sort_keys=True)
+
+
+def load_baseline(path):
+    """Read the results section of a JSON baseline file."""
+    with open(path) as f:
+        return json.load(f)["results"]
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE, metrics=COMPARED_METRICS,
+            noise_floor_ms=DEFAULT_NOISE_FLOOR_MS):
+    """
+    Compare results against a baseline and return a list of regression messages.
+    A slowdown must exceed both the relative tolerance and the absolute noise
+    floor to count. Benchmarks missing from either side are ignored so sweeps
+    can change size.
+    """
+    regressions = []
+    for name, current in sorted(results.items()):
+        reference = baseline.get(name)
+        if reference is None:
+            continue
+        for metric in metrics:
+            if metric not in current or metric not in reference:
+                continue
+            limit = reference[metric] + max(reference[metric] * tolerance, noise_floor_ms)
+            if current[metric] > limit:
+                regressions.append(
+                    f"{name}: {metric} {current[metric]:.3f} > {reference[metric]:.3f} "
+                    f"(+{(current[metric] / reference[metric] - 1.0) * 100:.0f}%, "
+                    f"tolerance {tolerance * 100:.0f}%)"
+                )
+    return regressions
+
+
+def format_table(results):
+    """Render results as a fixed-width text table."""
+    header = f"{'benchmark':<40} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'items/s':>14}"
+    lines = [header, "-" * len(header)]
+    for name, r in sorted(results.items()):
+        lines.append(
+            f"{name:<40} {r['p50_ms']:>10.3f} {r['p95_ms']:>10.3f} "
+            f"{r['p99_ms']:>10.3f} {r['throughput_per_s']:>14.0f}"
+        )
+    return "\n".join(lines)
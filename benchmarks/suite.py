@@ -0,0 +1,147 @@
+"""
+Benchmark cases for BigBangSimulator, run against a headless offscreen window.
+"""
+
+from types import SimpleNamespace
+
+from benchmarks.harness import measure, summarize
+
+
+DEFAULT_PARTICLE_COUNTS = (100, 1000, 10000)
+FULL_PARTICLE_COUNTS = (100, 1000, 10000, 100000, 1000000)
+DEFAULT_GRID_SIZES = (50, 100, 250, 500, 1000)
+BENCHMARK_SEED = 1234
+
+
+def create_headless_simulator(display="p3tinydisplay"):
+    """Create a BigBangSimulator rendering to an offscreen buffer."""
+    import bigbang_simulator
+
+    bigbang_simulator.use_offscreen_display(display)
+    simulator = bigbang_simulator.BigBangSimulator(seed=BENCHMARK_SEED)
+    # Let the asynchronous particle mesh loads finish before timing anything
+    while not simulator.assets.is_ready():
+        simulator.taskMgr.step()
+    # Benchmarks drive the hot paths directly; stop the per-frame tasks
+    for name in ("update_simulation_time_task", "expand_universe_task",
+                 "spawn_particles_task", "update_grid_size_task", "update_ui_task",
+                 "collect_batches_task"):
+        simulator.taskMgr.remove(name)
+    return simulator
+
+
+def clear_particles(simulator):
+    """Remove every particle so a sweep can start from an empty scene."""
+    for particle in simulator.particles:
+        particle.removeNode()
+    simulator.particles = []
+    if simulator.gpu_particles is not None:
+        simulator.gpu_particles.clear()
+
+
+def bench_spawn_new_particle(simulator, count):
+    """Per-particle spawn latency while filling the scene to count particles."""
+    clear_particles(simulator)
+    simulator.rng.reseed(BENCHMARK_SEED)
+    latencies = measure(simulator.spawn_new_particle, repeat=count, warmup=0)
+    return summarize(latencies)
+
+
+def bench_task(simulator, task_func, count, frames):
+    """Per-frame latency of a simulator task with count particles in the scene."""
+    task = SimpleNamespace(cont=None)
+    latencies = measure(lambda: task_func(task), repeat=frames)
+    return summarize(latencies, items_per_call=count)
+
+
+def bench_collect_batches(simulator, count):
+    """Latency of rebuilding every particle batch with count particles in the scene."""
+    simulator.batcher.collect()
+    def collect_all():
+        simulator.batcher.mark_dirty()
+        simulator.batcher.collect()
+    latencies = measure(collect_all, repeat=max(3, min(50, 200000 // max(count, 1))))
+    return summarize(latencies, items_per_call=count)
+
+
+def bench_spawn_and_collect(simulator, count, frames):
+    """Latency of spawning one particle and batching it with count particles in the scene."""
+    simulator.batcher.collect()
+    def spawn_and_collect():
+        simulator.spawn_new_particle()
+        simulator.batcher.collect()
+    latencies = measure(spawn_and_collect, repeat=frames)
+    # Drop the extra particles so later cases still see count particles
+    for particle in simulator.particles[count:]:
+        particle.removeNode()
+    del simulator.particles[count:]
+    simulator.batcher.collect()
+    return summarize(latencies)
+
+
+def bench_render_frame(simulator, count, frames):
+    """Latency of drawing one frame with count particles in the scene."""
+    simulator.batcher.collect()
+    latencies = measure(simulator.graphicsEngine.renderFrame, repeat=frames)
+    return summarize(latencies, items_per_call=count)
+
+
+def bench_update_ui_task(simulator, frames=600, frame_time=1.0 / 60):
+    """Cost of one HUD refresh while the simulation clock advances."""
+    task = SimpleNamespace(again=None)
+
+    def step():
+        simulator.simulation_time += frame_time * simulator.simulation_speed
+        simulator.ui.update_ui_task(task)
+
+    return summarize(measure(step, repeat=frames))
+
+
+def frames_for(count):
+    """Scale the number of timed frames down as particle counts grow."""
+    return max(5, min(200, 2000000 // max(count, 1)))
+
+
+def run_suite(simulator, particle_counts=DEFAULT_PARTICLE_COUNTS,
+              grid_sizes=DEFAULT_GRID_SIZES, render=True, log=print):
+    """Run every benchmark case and return a dict of summarized results."""
+    results = {}
+
+    for count in particle_counts:
+        frames = frames_for(count)
+        log(f"Benchmarking with {count} particles ({frames} frames)...")
+
+        results[f"spawn_new_particle[n={count}]"] = bench_spawn_new_particle(simulator, count)
+        results[f"expand_universe[n={count}]"] = bench_task(
+            simulator, simulator.expand_universe, count, frames)
+
+        # Keep the grid at its initial size so the task measures the extent scan only
+        simulator.current_grid_size = 10 ** 9
+        results[f"update_grid_size_task[n={count}]"] = bench_task(
+            simulator, simulator.update_grid_size_task, count, frames)
+        simulator.current_grid_size = simulator.initial_grid_size
+
+        results[f"collect_batches[n={count}]"] = bench_collect_batches(simulator, count)
+        if simulator.gpu_particles is None:
+            results[f"spawn_and_collect[n={count}]"] = bench_spawn_and_collect(
+                simulator, count, frames)
+
+        if render:
+            results[f"render_frame[n={count}]"] = bench_render_frame(simulator, count, frames)
+
+    clear_particles(simulator)
+
+    for size in grid_sizes:
+        log(f"Benchmarking create_grid({size})...")
+        results[f"create_grid[size={size}]"] = summarize(
+            measure(lambda: simulator.create_grid(size), repeat=20))
+    simulator.create_grid(simulator.current_grid_size)
+
+    log("Benchmarking update_ui_task...")
+    results["update_ui_task"] = bench_update_ui_task(simulator)
+
+    log("Benchmarking create_radial_texture...")
+    results["create_radial_texture"] = summarize(
+        measure(simulator.create_radial_texture, repeat=20))
+
+    return results
@@ -1,5 +1,5 @@
-import random
 import math
+import numpy as np
 from panda3d.core import loadPrcFileData
 loadPrcFileData("", "win-size 1600 1200")
 loadPrcFileData("", "window-title The Primeval Atom")
@@ -7,11 +7,33 @@ loadPrcFileData("", "load-display pandagl")  # Explicitly load OpenGL display
 from direct.showbase.ShowBase import ShowBase
 from panda3d.core import VBase4, Vec3, LColor, Texture, PNMImage, LineSegs, ClockObject
 from simulation_ui import SimulationUI
+from asset_manager import AssetManager
+from scene_batching import SceneBatcher
+from gpu_particles import GpuParticleSystem
+from temperature import TemperatureColorizer
+from cmb_skybox import DEFAULT_CMB_RESOLUTION, DEFAULT_CMB_SEED, CmbSkybox
+from random_streams import RandomStreams
+from session_recorder import SessionRecorder
 
 globalClock = ClockObject.getGlobalClock();
 
+
+def use_offscreen_display(display="p3tinydisplay"):
+    """Render into an offscreen buffer instead of a window, e.g. for benchmarks or a server.
+
+    Call before creating a BigBangSimulator; these prc pages come after the
+    display config set on import, so they take precedence over it.
+    """
+    loadPrcFileData("", "window-type offscreen")
+    loadPrcFileData("", f"load-display {display}")
+    loadPrcFileData("", "audio-library-name null")
+    loadPrcFileData("", "sync-video false")
+
+
 class BigBangSimulator(ShowBase):
-    def __init__(self):
+    def __init__(self, seed=None, use_gpu_particles=True, show_temperature=True, show_cmb=True,
+                 cmb_seed=DEFAULT_CMB_SEED, cmb_resolution=DEFAULT_CMB_RESOLUTION,
+                 record_session=False, session_path="session.npz"):
         try:
             ShowBase.__init__(self)
         except Exception as e:
@@ -27,6 +49,9 @@ class BigBangSimulator(ShowBase):
         # Basic lighting
         self.setup_lighting()
 
+        # Batch particles by type and keep static geometry flattened
+        self.batcher = SceneBatcher(self.render, self.taskMgr)
+
         # Grid parameters
         self.grid_node = None
         self.initial_grid_size = 50
@@ -38,19 +63,35 @@ class BigBangSimulator(ShowBase):
         # Create 3D grid
         self.create_grid(self.current_grid_size) # <--- NEW: Pass initial grid size
 
+        # Independent random streams per subsystem; the same seed replays the same universe
+        self.rng = RandomStreams(seed)
+        print(f"Random seed: {self.rng.seed}")
+
         # Particle system parameters
         self.num_initial_particles = 20
         self.expansion_rate = 0.1
         self.particles = []
+        # Each type may also name a custom "model" and "texture" to load
         self.particle_types = {
             "type1": {"color": LColor(1, 0.5, 0, 1), "scale": 0.5}, # Orange
             "type2": {"color": LColor(0, 0.5, 1, 1), "scale": 0.7}, # Blue
             "type3": {"color": LColor(0.8, 0, 0.8, 1), "scale": 0.6}, # Purple
             "type4": {"color": LColor(0.2, 0.8, 0.2, 1), "scale": 0.4}, # Green
         }
+        # Start loading particle meshes and textures in the background
+        self.assets = AssetManager(self.loader, self.taskMgr, self.particle_types,
+                                   on_change=self.batcher.mark_dirty)
+        # A batch draws with a single state, so the type color lives on the type root
+        for particle_type_name, particle_props in self.particle_types.items():
+            self.batcher.get_type_root(particle_type_name).setColor(particle_props["color"])
         self.spawn_interval = 0.5 # Seconds between new particle spawns
         self.time_since_last_spawn = 0
 
+        # Advance particles with a compute shader when the GPU supports it,
+        # otherwise gpu_particles stays None and the CPU path below is used
+        self.use_gpu_particles = use_gpu_particles
+        self.gpu_particles = GpuParticleSystem.create(self)
+
         # Simulation time parameters
         self.simulation_time = 0.0
         self.simulation_speed = 5.0 # 1.0 is normal speed, 2.0 is double speed, etc.
@@ -59,6 +100,17 @@ class BigBangSimulator(ShowBase):
         self.speed_increment = 1.0
         self.paused = False
 
+        # Color particles by temperature as the universe cools
+        self.show_temperature = show_temperature
+        self.temperature = TemperatureColorizer(self) if self.show_temperature else None
+
+        # Draw the cosmic microwave background behind the scene when shaders are
+        # available; otherwise cmb stays None and the black background is kept
+        self.show_cmb = show_cmb
+        self.cmb_seed = cmb_seed  # Seed of the anisotropy pattern; each seed is cached separately
+        self.cmb_resolution = cmb_resolution  # Cube map face size in texels
+        self.cmb = CmbSkybox.create(self)
+
         # Create initial particles
         self.create_initial_particles()
 
@@ -74,6 +126,14 @@ class BigBangSimulator(ShowBase):
         # Setup UI and controls
         self.ui = SimulationUI(self)
 
+        # Optionally record the session, saved to session_path on exit
+        self.record_session = record_session
+        self.session_path = session_path
+        # Not self.recorder: ShowBase drives its own RecorderController under that name
+        self.session_recorder = SessionRecorder(self) if self.record_session else None
+        if self.session_recorder is not None:
+            self.finalExitCallbacks.append(lambda: self.session_recorder.save(self.session_path))
+
     def setup_lighting(self):
         # ... (lighting code remains the same as before) ...
         from panda3d.core import AmbientLight, DirectionalLight, VBase4
@@ -139,19 +199,26 @@ class BigBangSimulator(ShowBase):
         ls.moveTo(0, -grid_size, 0)
         ls.drawTo(0, grid_size, 0)
 
-        # Generate the geometry and attach it to render
-        self.grid_node = self.render.attachNewNode(ls.create()) # Store reference
-        self.grid_node.setPos(0, 0, 0) # Position the grid at the origin
+        # Generate the geometry and attach it, flattened, with the static geometry
+        self.grid_node = self.batcher.add_static(ls.create()) # Store reference
+
+    def particle_extent(self):
+        """Return the largest absolute coordinate of any particle."""
+        if self.gpu_particles is not None:
+            # Positions live on the GPU; each pool bounds its extent without readback or a scan
+            return self.gpu_particles.max_extent()
+        max_extent = 0.0
+        for particle in self.particles:
+            pos = particle.getPos()
+            # Get the maximum absolute coordinate value
+            extent = max(abs(pos.x), abs(pos.y), abs(pos.z))
+            if extent > max_extent:
+                max_extent = extent
+        return max_extent
 
     def update_grid_size_task(self, task): # <--- NEW: Task to dynamically update grid size
-        if not self.paused and self.particles: # Only update if not paused and particles exist
-            max_extent = 0.0
-            for particle in self.particles:
-                pos = particle.getPos()
-                # Get the maximum absolute coordinate value
-                extent = max(abs(pos.x), abs(pos.y), abs(pos.z))
-                if extent > max_extent:
-                    max_extent = extent
+        if not self.paused: # Only update if not paused
+            max_extent = self.particle_extent()
 
             # Check if particles are approaching the edge of the current grid
             if max_extent > (self.current_grid_size * self.grid_growth_threshold):
@@ -162,37 +229,62 @@ class BigBangSimulator(ShowBase):
         return task.cont
 
     def create_initial_particles(self):
-        for _ in range(self.num_initial_particles):
-            self.spawn_new_particle()
+        self.spawn_particles(self.num_initial_particles)
 
     def spawn_new_particle(self):
-        # Create a sphere instead of loading "models/smiley"
-        sphere = self.loader.loadModel("misc/sphere") # Panda3D's default sphere model
-        sphere.reparentTo(self.render)
-
-        # Choose a random particle type
-        particle_type_name = random.choice(list(self.particle_types.keys()))
+        self.spawn_particles(1)
+
+    def spawn_particles(self, count):
+        """Spawn count particles with one vectorized draw per random stream.
+
+        Each stream only ever yields one double per particle and coordinate,
+        so spawning n particles at once draws exactly the same numbers as
+        spawning them one by one.
+        """
+        # Choose a random particle type for each particle
+        type_names = list(self.particle_types.keys())
+        type_indices = (self.rng.stream("types").random(count) * len(type_names)).astype(np.intp)
+
+        # Initial random positions close to the origin, expanding away from it
+        positions = self.rng.stream("spawning").uniform(-0.1, 0.1, size=(count, 3))
+        lengths = np.linalg.norm(positions, axis=1, keepdims=True)
+        directions = np.divide(positions, lengths, out=np.zeros_like(positions), where=lengths > 0)
+
+        if self.gpu_particles is not None:
+            # The particles only exist in GPU buffers from here on
+            for type_index, particle_type_name in enumerate(type_names):
+                selected = type_indices == type_index
+                if selected.any():
+                    self.gpu_particles.spawn(particle_type_name, positions[selected], directions[selected])
+            return
+
+        for type_index, position, direction in zip(type_indices.tolist(), positions.tolist(),
+                                                   directions.tolist()):
+            self.add_particle(type_names[type_index], position, direction)
+
+    def add_particle(self, particle_type_name, position, direction):
+        """Create a CPU-path particle node of the given type."""
         particle_props = self.particle_types[particle_type_name]
 
-        # Set color and scale
-        sphere.setColor(particle_props["color"])
+        # Instance the type's shared, preloaded geometry; the batcher batches it later
+        sphere = self.batcher.add_particle(particle_type_name)
+        self.assets.instance(particle_type_name, sphere)
+
+        # Set scale; the color comes from the type root
         sphere.setScale(particle_props["scale"])
 
         particle = sphere # 'particle' refers to the sphere
-
-        # Initial random position close to the origin
-        x = random.uniform(-0.1, 0.1)
-        y = random.uniform(-0.1, 0.1)
-        z = random.uniform(-0.1, 0.1)
-        particle.setPos(x, y, z)
+        particle.setPos(*position)
+        particle.setPythonTag("spawn_time", self.simulation_time) # For the temperature colors
+        particle.setPythonTag("type", particle_type_name)
 
         # Store initial direction for expansion as individual components
-        direction_vec = Vec3(x, y, z).normalized()
-        particle.setTag("dir_x", str(direction_vec.x))
-        particle.setTag("dir_y", str(direction_vec.y))
-        particle.setTag("dir_z", str(direction_vec.z))
+        particle.setTag("dir_x", str(direction[0]))
+        particle.setTag("dir_y", str(direction[1]))
+        particle.setTag("dir_z", str(direction[2]))
 
         self.particles.append(particle)
+        return particle
 
     def update_simulation_time(self, task):
         if not self.paused: # Only update if not paused
@@ -210,6 +302,12 @@ class BigBangSimulator(ShowBase):
         return task.cont
 
     def expand_universe(self, task):
+        if self.gpu_particles is not None:
+            # The compute shader runs every frame, so a paused frame advances by zero
+            dt = 0.0 if self.paused else globalClock.getDt()
+            self.gpu_particles.advance(dt, self.simulation_speed)
+            return task.cont
+
         if not self.paused: # Only expand if not paused
             dt = globalClock.getDt() # Time elapsed since last frame
             for particle in self.particles:
@@ -0,0 +1,232 @@
+import os
+
+import numpy as np
+from panda3d.core import (Geom, GeomNode, GeomTriangles, GeomVertexData, GeomVertexFormat,
+                          GeomVertexWriter, PTAFloat, SamplerState, Shader, Texture)
+
+from temperature import TemperatureModel
+
+
+DEFAULT_CMB_SEED = 1
+DEFAULT_CMB_RESOLUTION = 256
+DEFAULT_CMB_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "primeval-atom")
+CMB_CACHE_VERSION = 1  # Bump when the generator changes so stale caches are ignored
+CMB_WAVES = 96  # Plane waves summed into the anisotropy field
+SKYBOX_SCALE = 10.0  # Inside the far plane and beyond the near plane; depth is ignored
+
+# Looks up the anisotropy of the view direction and colors it by temperature
+SKYBOX_VERTEX_SHADER = """
+#version 150
+uniform mat4 p3d_ModelViewProjectionMatrix;
+in vec4 p3d_Vertex;
+out vec3 direction;
+
+void main() {
+    gl_Position = p3d_ModelViewProjectionMatrix * p3d_Vertex;
+    direction = p3d_Vertex.xyz;
+}
+"""
+
+SKYBOX_FRAGMENT_SHADER = """
+#version 150
+uniform samplerCube anisotropy;
+uniform sampler2D colormap;
+uniform float cmb_params[5];  // temperature, log_min, log_range, contrast, brightness
+in vec3 direction;
+out vec4 p3d_FragColor;
+
+void main() {
+    float delta = texture(anisotropy, direction).r * 2.0 - 1.0;
+    // Keep the hot and cold spots inside the colormap at every mean temperature
+    float contrast = cmb_params[3];
+    float u = clamp((log(cmb_params[0]) - cmb_params[1]) / cmb_params[2], contrast, 1.0 - contrast);
+    u += contrast * delta;
+    vec3 color = texture(colormap, vec2(u, 0.5)).rgb;
+    p3d_FragColor = vec4(color * cmb_params[4], 1.0);
+}
+"""
+
+# Direction of each cube map face's texel grid, following the OpenGL cube map
+# convention: (major axis, s axis, t axis) as functions of sc, tc in [-1, 1]
+CUBE_FACES = (
+    lambda sc, tc, one: (one, -tc, -sc),   # +X
+    lambda sc, tc, one: (-one, -tc, sc),   # -X
+    lambda sc, tc, one: (sc, one, tc),     # +Y
+    lambda sc, tc, one: (sc, -one, -tc),   # -Y
+    lambda sc, tc, one: (sc, -tc, one),    # +Z
+    lambda sc, tc, one: (-sc, -tc, -one),  # -Z
+)
+
+
+def cube_face_directions(face, resolution):
+    """Return the (resolution, resolution, 3) unit view direction of every texel of a face."""
+    coords = (np.arange(resolution, dtype=np.float64) + 0.5) / resolution * 2.0 - 1.0
+    tc, sc = np.meshgrid(coords, coords, indexing="ij")  # Rows go along t, columns along s
+    x, y, z = CUBE_FACES[face](sc, tc, np.ones_like(sc))
+    directions = np.stack((x, y, z), axis=-1)
+    return directions / np.linalg.norm(directions, axis=-1, keepdims=True)
+
+
+def generate_cmb_field(seed, resolution, waves=CMB_WAVES):
+    """Generate a (6, resolution, resolution) uint8 cube map of CMB-like anisotropy.
+
+    The field is a sum of plane waves over the sphere with random directions
+    and phases and a power spectrum that falls off with frequency, so it is
+    seamless across faces and dominated by large blobs with finer structure
+    on top. It is evaluated on every texel direction at once with NumPy and
+    scaled so 0 and 255 are the coldest and hottest spots.
+    """
+    rng = np.random.default_rng(seed)
+    wave_directions = rng.normal(size=(waves, 3))
+    wave_directions /= np.linalg.norm(wave_directions, axis=1, keepdims=True)
+    frequencies = np.geomspace(1.0, 24.0, waves) * rng.uniform(0.8, 1.2, waves)
+    amplitudes = frequencies ** -1.0 * rng.rayleigh(1.0, waves)
+    phases = rng.uniform(0.0, 2.0 * np.pi, waves)
+
+    field = np.empty((6, resolution, resolution), dtype=np.float64)
+    wave_vectors = (wave_directions * frequencies[:, np.newaxis]).T
+    for face in range(6):
+        projections = cube_face_directions(face, resolution) @ wave_vectors
+        field[face] = np.cos(projections + phases) @ amplitudes
+    field -= field.min()
+    field /= field.max()
+    return np.round(field * 255.0).astype(np.uint8)
+
+
+def cmb_cache_path(cache_dir, seed, resolution):
+    """Path of the cached field for a seed and resolution."""
+    return os.path.join(cache_dir, f"cmb_v{CMB_CACHE_VERSION}_seed{seed}_res{resolution}.npy")
+
+
+def load_cmb_field(seed, resolution, cache_dir=DEFAULT_CMB_CACHE_DIR):
+    """Return the anisotropy field for a seed and resolution, generating and caching it if needed."""
+    path = cmb_cache_path(cache_dir, seed, resolution)
+    try:
+        field = np.load(path)
+        if field.shape == (6, resolution, resolution) and field.dtype == np.uint8:
+            return field
+    except (OSError, ValueError):
+        pass
+
+    field = generate_cmb_field(seed, resolution)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        # Write then rename, so an interrupted run never leaves a truncated cache
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as cache_file:
+            np.save(cache_file, field)
+        os.replace(temp_path, path)
+    except OSError as e:
+        print(f"Could not cache CMB skybox at '{path}': {e}")
+    return field
+
+
+def make_cube_map(field):
+    """Upload a (6, n, n) uint8 field as a luminance cube map texture."""
+    texture = Texture("cmb_anisotropy")
+    texture.setupCubeMap(field.shape[1], Texture.T_unsigned_byte, Texture.F_luminance)
+    texture.setRamImage(np.ascontiguousarray(field).tobytes())
+    texture.setMinfilter(SamplerState.FT_linear)
+    texture.setMagfilter(SamplerState.FT_linear)
+    return texture
+
+
+def make_colormap_texture(colormap):
+    """Upload a (n, 4) uint8 RGBA lookup table as an n x 1 texture."""
+    texture = Texture("cmb_colormap")
+    texture.setup2dTexture(len(colormap), 1, Texture.T_unsigned_byte, Texture.F_rgba8)
+    texture.setRamImageAs(np.ascontiguousarray(colormap).tobytes(), "RGBA")
+    texture.setMinfilter(SamplerState.FT_linear)
+    texture.setMagfilter(SamplerState.FT_linear)
+    texture.setWrapU(SamplerState.WM_clamp)
+    texture.setWrapV(SamplerState.WM_clamp)
+    return texture
+
+
+def make_cube(name):
+    """Build a GeomNode holding a unit cube centred on the origin."""
+    vdata = GeomVertexData(name, GeomVertexFormat.getV3(), Geom.UH_static)
+    vertex = GeomVertexWriter(vdata, "vertex")
+    for x in (-1, 1):
+        for y in (-1, 1):
+            for z in (-1, 1):
+                vertex.addData3(x, y, z)
+    triangles = GeomTriangles(Geom.UH_static)
+    # Corner index = 4x + 2y + z with each coordinate 0 or 1
+    for a, b, c, d in ((0, 1, 3, 2), (4, 6, 7, 5), (0, 4, 5, 1),
+                       (2, 3, 7, 6), (0, 2, 6, 4), (1, 5, 7, 3)):
+        triangles.addVertices(a, b, c)
+        triangles.addVertices(a, c, d)
+    geom = Geom(vdata)
+    geom.addPrimitive(triangles)
+    node = GeomNode(name)
+    node.addGeom(geom)
+    return node
+
+
+def shaders_supported(gsg):
+    """Return True if the graphics state guardian can draw the skybox shader."""
+    if gsg is None:
+        return False
+    return bool(gsg.getSupportsGlsl() and gsg.getSupportsCubeMap())
+
+
+class CmbSkybox:
+    """Cosmic microwave background drawn as a skybox behind everything else.
+
+    The anisotropy pattern is generated once per seed and resolution and
+    cached on disk as a cube map. The cube follows the camera's position but
+    not its rotation and is drawn first without depth, so each frame costs a
+    dozen triangles. The background's temperature follows simulation time
+    through a uniform, and is colored with the same colormap as the particles.
+    The anisotropy is exaggerated far beyond the real one part in 100,000 so
+    the pattern is visible.
+    """
+
+    def __init__(self, camera, render, model=None, seed=DEFAULT_CMB_SEED,
+                 resolution=DEFAULT_CMB_RESOLUTION, cache_dir=DEFAULT_CMB_CACHE_DIR,
+                 contrast=0.15, brightness=0.35):
+        self.model = model if model is not None else TemperatureModel()
+        self.seed = seed
+        self.resolution = resolution
+        self.params = PTAFloat([self.model.initial_temperature, self.model.log_min,
+                                self.model.log_range, contrast, brightness])
+
+        self.anisotropy_texture = make_cube_map(load_cmb_field(seed, resolution, cache_dir))
+        self.colormap_texture = make_colormap_texture(self.model.colormap)
+
+        self.skybox_np = camera.attachNewNode(make_cube("cmb_skybox"))
+        self.skybox_np.setScale(SKYBOX_SCALE)
+        self.skybox_np.setCompass(render)  # Keep the sky fixed while the camera turns
+        self.skybox_np.setBin("background", -1)
+        self.skybox_np.setDepthWrite(False)
+        self.skybox_np.setDepthTest(False)
+        self.skybox_np.setTwoSided(True)
+        self.skybox_np.setLightOff(1)
+        self.skybox_np.setShader(Shader.make(Shader.SL_GLSL, SKYBOX_VERTEX_SHADER,
+                                             SKYBOX_FRAGMENT_SHADER))
+        self.skybox_np.setShaderInput("anisotropy", self.anisotropy_texture)
+        self.skybox_np.setShaderInput("colormap", self.colormap_texture)
+        self.skybox_np.setShaderInput("cmb_params", self.params)
+
+    @classmethod
+    def create(cls, simulator):
+        """Return a skybox for the simulator, or None to keep the flat background color."""
+        gsg = simulator.win.getGsg() if simulator.win is not None else None
+        if not simulator.show_cmb or not shaders_supported(gsg):
+            return None
+        model = simulator.temperature.model if simulator.temperature is not None else None
+        skybox = cls(simulator.camera, simulator.render, model,
+                     seed=simulator.cmb_seed, resolution=simulator.cmb_resolution)
+        simulator.taskMgr.add(skybox.update_temperature_task, "update_cmb_task",
+                              extraArgs=[simulator], appendTask=True)
+        return skybox
+
+    def set_simulation_time(self, simulation_time):
+        """Cool the background to its temperature at simulation_time."""
+        self.params[0] = float(self.model.temperatures(simulation_time, 0.0))
+
+    def update_temperature_task(self, simulator, task):
+        """Follow the simulation clock; only a uniform changes, the cube map is never regenerated."""
+        self.set_simulation_time(simulator.simulation_time)
+        return task.cont
@@ -0,0 +1,371 @@
+import numpy as np
+from panda3d.core import (ComputeNode, GeomEnums, OmniBoundingVolume,
+                          PTAFloat, Shader, ShaderInput, Texture)
+
+
+WORK_GROUP_SIZE = 64
+INITIAL_CAPACITY = 1024
+MAX_LIGHTS = 4  # Scene lights applied to instanced particles, besides ambient light
+
+# Advances every particle along its direction. A slot whose position stamp
+# differs from its seed stamp was (re)spawned on the CPU since the last
+# dispatch, so it restarts from its seed position. Stamps are unsigned
+# integers, so they compare exactly however long the simulation runs.
+UPDATE_COMPUTE_SHADER = """
+#version 430
+layout(local_size_x = %d) in;
+
+uniform samplerBuffer seeds;         // xyz = spawn position
+uniform usamplerBuffer seed_stamps;  // x = spawn stamp of the seed
+uniform samplerBuffer directions;    // xyz = expansion direction
+layout(rgba32f) uniform imageBuffer positions;         // xyz = position
+layout(r32ui) uniform uimageBuffer position_stamps;    // x = stamp of the seed the position started from
+
+uniform int particle_count;
+uniform float simulation_params[3];  // expansion_rate, dt, simulation_speed
+
+void main() {
+    int i = int(gl_GlobalInvocationID.x);
+    if (i >= particle_count) {
+        return;
+    }
+    vec4 position = imageLoad(positions, i);
+    uint stamp = texelFetch(seed_stamps, i).x;
+    if (imageLoad(position_stamps, i).x != stamp) {
+        position = texelFetch(seeds, i);
+        imageStore(position_stamps, i, uvec4(stamp));
+    }
+    float step = simulation_params[0] * simulation_params[1] * simulation_params[2];
+    position.xyz += texelFetch(directions, i).xyz * step;
+    imageStore(positions, i, position);
+}
+""" % WORK_GROUP_SIZE
+
+# Draws one instance of the type's shared geometry per particle, lit by the
+# scene's lights and textured like the CPU path
+INSTANCED_VERTEX_SHADER = """
+#version 430
+uniform mat4 p3d_ModelViewProjectionMatrix;
+uniform mat4 p3d_ModelViewMatrix;
+uniform mat3 p3d_NormalMatrix;
+uniform samplerBuffer positions;
+uniform samplerBuffer colors;
+uniform float particle_scale;
+
+in vec4 p3d_Vertex;
+in vec3 p3d_Normal;
+in vec2 p3d_MultiTexCoord0;
+out vec4 color;
+out vec3 view_position;
+out vec3 view_normal;
+out vec2 texcoord;
+
+void main() {
+    vec3 offset = texelFetch(positions, gl_InstanceID).xyz;
+    vec4 vertex = vec4(p3d_Vertex.xyz * particle_scale + offset, 1.0);
+    gl_Position = p3d_ModelViewProjectionMatrix * vertex;
+    view_position = (p3d_ModelViewMatrix * vertex).xyz;
+    // Geometry without normals faces +Z, as in the fixed-function pipeline
+    vec3 normal = dot(p3d_Normal, p3d_Normal) > 0.0 ? p3d_Normal : vec3(0.0, 0.0, 1.0);
+    view_normal = p3d_NormalMatrix * normal;  // Instances are only scaled uniformly
+    texcoord = p3d_MultiTexCoord0;
+    color = texelFetch(colors, gl_InstanceID);
+}
+"""
+
+INSTANCED_FRAGMENT_SHADER = """
+#version 430
+#define MAX_LIGHTS %d
+
+uniform struct p3d_LightModelParameters {
+    vec4 ambient;
+} p3d_LightModel;
+uniform struct p3d_LightSourceParameters {
+    vec4 color;
+    vec4 position;  // View space; w = 0 for directional lights, with xyz pointing at the light
+} p3d_LightSource[MAX_LIGHTS];
+uniform sampler2D p3d_Texture0;
+uniform vec4 p3d_ColorScale;
+
+in vec4 color;
+in vec3 view_position;
+in vec3 view_normal;
+in vec2 texcoord;
+out vec4 p3d_FragColor;
+
+void main() {
+    vec3 normal = normalize(view_normal);
+    vec3 light = p3d_LightModel.ambient.rgb;
+    for (int i = 0; i < MAX_LIGHTS; ++i) {
+        vec3 to_light = p3d_LightSource[i].position.xyz - view_position * p3d_LightSource[i].position.w;
+        float distance = length(to_light);
+        if (distance > 0.0) {  // Unused light slots are all zero
+            light += p3d_LightSource[i].color.rgb * max(dot(normal, to_light / distance), 0.0);
+        }
+    }
+    vec4 base = color * texture(p3d_Texture0, texcoord);
+    p3d_FragColor = vec4(base.rgb * light, base.a) * p3d_ColorScale;
+}
+""" % MAX_LIGHTS
+
+
+def compute_shaders_supported(gsg):
+    """Return True if the graphics state guardian can run the GPU particle path."""
+    if gsg is None:
+        return False
+    return bool(gsg.getSupportsComputeShaders() and gsg.getSupportsBufferTexture()
+                and gsg.getSupportsGlsl())
+
+
+def make_buffer_texture(name, capacity, component_type=Texture.T_float, texture_format=Texture.F_rgba32):
+    """Create a zero-filled buffer texture with room for capacity particles."""
+    texture = Texture(name)
+    texture.setupBufferTexture(capacity, component_type, texture_format, GeomEnums.UH_dynamic)
+    texture.makeRamImage()
+    return texture
+
+
+def buffer_view(texture, dtype=np.float32, components=4):
+    """Return a writable (capacity, components) view of a buffer texture's RAM image."""
+    return np.frombuffer(memoryview(texture.modifyRamImage()), dtype=dtype).reshape(-1, components)
+
+
+def next_stamps(stamps):
+    """Return the stamps that follow stamps, wrapping around 2**32 and skipping 0.
+
+    0 marks a slot that was never seeded, and each slot's new stamp always
+    differs from the one the GPU last applied to it.
+    """
+    following = stamps + np.uint32(1)
+    following[following == 0] = 1
+    return following
+
+
+class GpuParticlePool:
+    """GPU storage, compute dispatch and instanced drawing for the particles of one type."""
+
+    def __init__(self, system, type_name, parent, prototype, scale, color):
+        self.system = system
+        self.type_name = type_name
+        self.count = 0
+        self.capacity = 0
+        self.spawn_color = np.round(np.asarray(color) * 255).astype(np.uint8)  # RGBA of new particles
+
+        # CPU copies of what was uploaded; positions only ever live on the GPU
+        self.seeds = np.zeros((0, 4), dtype=np.float32)
+        self.stamps = np.zeros(0, dtype=np.uint32)  # Spawn stamp of each slot's seed
+        self.directions = np.zeros((0, 4), dtype=np.float32)
+        self.colors = np.zeros((0, 4), dtype=np.uint8)
+        self.spawn_travel = np.zeros(0, dtype=np.float64)  # Shared travel when each seed was set
+        # Kept up to date as particles spawn, so bounding the extent never scans every particle
+        self.max_seed_extent = 0.0  # Largest absolute coordinate of any live seed
+        self.max_direction_extent = 0.0  # Largest absolute component of any live direction
+        self.min_spawn_travel = 0.0  # Shared travel when the oldest live seed was set
+        self.seeds_dirty = False
+        self.colors_dirty = False
+
+        self.compute_np = parent.attachNewNode(ComputeNode(f"{type_name}_update"))
+        self.compute_np.node().addDispatch(1, 1, 1)
+        self.compute_np.setShader(system.compute_shader)
+        self.compute_np.setShaderInput("simulation_params", system.params)
+        self.compute_np.setBin("background", 0)  # Dispatch before particles are drawn
+
+        self.draw_np = parent.attachNewNode(f"{type_name}_instances")
+        prototype.instanceTo(self.draw_np)
+        self.draw_np.setShader(system.draw_shader)
+        self.draw_np.setShaderInput("particle_scale", float(scale))
+        # Instances spread far beyond the bounds of the single source mesh
+        self.draw_np.node().setBounds(OmniBoundingVolume())
+        self.draw_np.node().setFinal(True)
+
+        self.resize(INITIAL_CAPACITY)
+        self.update_dispatch()
+
+    def resize(self, capacity):
+        """Reallocate GPU buffers, reseeding every live particle at its current position."""
+        positions = self.current_positions()
+        self.seed_texture = make_buffer_texture(f"{self.type_name}_seeds", capacity)
+        self.stamp_texture = make_buffer_texture(f"{self.type_name}_stamps", capacity,
+                                                 Texture.T_unsigned_int, Texture.F_r32i)
+        self.direction_texture = make_buffer_texture(f"{self.type_name}_directions", capacity)
+        self.position_texture = make_buffer_texture(f"{self.type_name}_positions", capacity)
+        self.position_stamp_texture = make_buffer_texture(f"{self.type_name}_position_stamps", capacity,
+                                                          Texture.T_unsigned_int, Texture.F_r32i)
+        self.color_texture = make_buffer_texture(f"{self.type_name}_colors", capacity,
+                                                 Texture.T_unsigned_byte, Texture.F_rgba8)
+
+        seeds = np.zeros((capacity, 4), dtype=np.float32)
+        stamps = np.zeros(capacity, dtype=np.uint32)
+        directions = np.zeros((capacity, 4), dtype=np.float32)
+        colors = np.zeros((capacity, 4), dtype=np.uint8)
+        spawn_travel = np.zeros(capacity, dtype=np.float64)
+        count = self.count
+        seeds[:count, :3] = positions
+        # The new position buffer starts with every stamp at 0, so live slots restart from their seeds
+        stamps[:count] = next_stamps(self.stamps[:count])
+        directions[:count] = self.directions[:count]
+        colors[:count] = self.colors[:count]
+        spawn_travel[:count] = self.system.travel
+        self.seeds, self.stamps, self.directions, self.colors = seeds, stamps, directions, colors
+        self.spawn_travel = spawn_travel
+        self.capacity = capacity
+        # Every seed was just set, so the extent bound is exact again
+        self.max_seed_extent = float(np.abs(positions).max()) if count else 0.0
+        self.max_direction_extent = float(np.abs(directions[:count, :3]).max()) if count else 0.0
+        self.min_spawn_travel = self.system.travel
+
+        self.compute_np.setShaderInput("seeds", self.seed_texture)
+        self.compute_np.setShaderInput("seed_stamps", self.stamp_texture)
+        self.compute_np.setShaderInput("directions", self.direction_texture)
+        self.compute_np.setShaderInput(
+            ShaderInput("positions", self.position_texture, True, True, -1, 0, 0))
+        self.compute_np.setShaderInput(
+            ShaderInput("position_stamps", self.position_stamp_texture, True, True, -1, 0, 0))
+        self.draw_np.setShaderInput("positions", self.position_texture)
+        self.draw_np.setShaderInput("colors", self.color_texture)
+        self.seeds_dirty = True
+        self.colors_dirty = True
+        self.upload()
+
+    def spawn(self, positions, directions):
+        """Add particles from (n, 3) positions and directions; they start moving on the next dispatch."""
+        positions = np.atleast_2d(positions)
+        start, end = self.count, self.count + len(positions)
+        capacity = self.capacity
+        while capacity < end:
+            capacity *= 2
+        if capacity != self.capacity:
+            self.resize(capacity)
+        self.seeds[start:end, :3] = positions
+        self.stamps[start:end] = next_stamps(self.stamps[start:end])
+        self.directions[start:end, :3] = directions
+        self.colors[start:end] = self.spawn_color
+        self.spawn_travel[start:end] = self.system.travel
+        if start == 0:
+            self.max_seed_extent = self.max_direction_extent = 0.0
+            self.min_spawn_travel = self.system.travel
+        self.max_seed_extent = max(self.max_seed_extent, float(np.abs(positions).max()))
+        self.max_direction_extent = max(self.max_direction_extent,
+                                        float(np.abs(self.directions[start:end, :3]).max()))
+        self.count = end
+        self.seeds_dirty = True
+        self.colors_dirty = True
+        self.system.dirty_pools.add(self)
+
+    def set_colors(self, colors):
+        """Replace the color of every particle with (count, 4) uint8 RGBA values."""
+        self.colors[:self.count] = colors
+        self.colors_dirty = True
+        self.system.dirty_pools.add(self)
+
+    def clear(self):
+        """Drop every particle in the pool."""
+        self.count = 0
+        self.update_dispatch()
+
+    def upload(self):
+        """Copy changed CPU arrays into their buffer textures."""
+        if self.seeds_dirty:
+            buffer_view(self.seed_texture)[:] = self.seeds
+            buffer_view(self.stamp_texture, np.uint32, 1)[:, 0] = self.stamps
+            buffer_view(self.direction_texture)[:] = self.directions
+            self.seeds_dirty = False
+        if self.colors_dirty:
+            buffer_view(self.color_texture, np.uint8)[:] = self.colors
+            self.colors_dirty = False
+        self.update_dispatch()
+
+    def update_dispatch(self):
+        """Match the compute dispatch size and instance count to the particle count."""
+        if self.count == 0:
+            self.compute_np.stash()
+            self.draw_np.stash()
+            return
+        self.compute_np.unstash()
+        self.draw_np.unstash()
+        groups = (self.count + WORK_GROUP_SIZE - 1) // WORK_GROUP_SIZE
+        self.compute_np.node().setDispatch(0, (groups, 1, 1))
+        self.compute_np.setShaderInput("particle_count", self.count)
+        self.draw_np.setInstanceCount(self.count)
+
+    def current_positions(self):
+        """Reconstruct current positions on the CPU from seeds and the shared travel distance."""
+        count = self.count
+        travelled = (self.system.travel - self.spawn_travel[:count])[:, np.newaxis]
+        return self.seeds[:count, :3] + self.directions[:count, :3] * travelled
+
+    def max_extent(self):
+        """Upper bound on the largest absolute coordinate of any particle in the pool.
+
+        No coordinate has grown by more than the largest direction component
+        times the distance travelled since the oldest seed was set, so this
+        takes constant time however many particles there are. It is exact for
+        particles moving along an axis and is tightened on every resize.
+        """
+        if self.count == 0:
+            return 0.0
+        travelled = self.system.travel - self.min_spawn_travel
+        return self.max_seed_extent + self.max_direction_extent * travelled
+
+
+class GpuParticleSystem:
+    """Keeps particle positions in GPU buffers and advances them with a compute shader.
+
+    Particle data is only ever written from the CPU when particles spawn; the
+    per-frame update runs entirely on the GPU, driven by the expansion rate,
+    dt and simulation speed uniforms. Positions are never read back: because
+    every particle moves in a straight line, the CPU tracks the shared travel
+    distance instead and reconstructs positions when it needs them.
+    """
+
+    def __init__(self, parent_for_type, prototypes, particle_types, expansion_rate):
+        self.expansion_rate = expansion_rate
+        self.travel = 0.0  # Distance every particle has moved along its direction so far
+        self.dirty_pools = set()
+
+        self.params = PTAFloat([expansion_rate, 0.0, 0.0])
+        self.compute_shader = Shader.makeCompute(Shader.SL_GLSL, UPDATE_COMPUTE_SHADER)
+        self.draw_shader = Shader.make(Shader.SL_GLSL, INSTANCED_VERTEX_SHADER,
+                                       INSTANCED_FRAGMENT_SHADER)
+
+        self.pools = {}
+        for type_name, props in particle_types.items():
+            self.pools[type_name] = GpuParticlePool(
+                self, type_name, parent_for_type(type_name), prototypes(type_name),
+                props["scale"], props["color"])
+
+    @classmethod
+    def create(cls, simulator):
+        """Return a GPU particle system for the simulator, or None to use the CPU path."""
+        gsg = simulator.win.getGsg() if simulator.win is not None else None
+        if not simulator.use_gpu_particles or not compute_shaders_supported(gsg):
+            return None
+        return cls(simulator.batcher.get_type_root, simulator.assets.get_prototype,
+                   simulator.particle_types, simulator.expansion_rate)
+
+    @property
+    def count(self):
+        return sum(pool.count for pool in self.pools.values())
+
+    def spawn(self, type_name, positions, directions):
+        """Queue new particles of the given type for upload."""
+        self.pools[type_name].spawn(positions, directions)
+
+    def advance(self, dt, simulation_speed):
+        """Set this frame's uniforms and upload any newly spawned particles."""
+        self.params[1] = dt
+        self.params[2] = simulation_speed
+        self.travel += self.expansion_rate * dt * simulation_speed
+        for pool in self.dirty_pools:
+            pool.upload()
+        self.dirty_pools.clear()
+
+    def clear(self):
+        """Remove every particle."""
+        for pool in self.pools.values():
+            pool.clear()
+        self.dirty_pools.clear()
+
+    def max_extent(self):
+        """Upper bound on the largest absolute coordinate of any particle, without GPU readback."""
+        return max((pool.max_extent() for pool in self.pools.values()), default=0.0)
@@ -0,0 +1,71 @@
+import numpy as np
+
+
+# Spawn key tags keep subsystem and worker keys from ever colliding
+STREAM_KEY = 0
+WORKER_KEY = 1
+
+
+def stream_key(name):
+    """Spawn key suffix for a named stream; length-prefixed so no name is a prefix of another."""
+    encoded = name.encode("utf-8")
+    return (STREAM_KEY, len(encoded), *encoded)
+
+
+class RandomStreams:
+    """Seedable source of independent NumPy random streams.
+
+    Every subsystem asks for a stream by name ("types", "spawning", ...) and
+    gets its own Generator, derived from the root seed and the name alone.
+    Adding a subsystem, or drawing more from one, never shifts the numbers
+    another subsystem sees. worker() derives the streams of a worker process
+    the same way from its index, so a run split over N workers is
+    bit-identical for a given seed and N. get_state() captures the position
+    of every stream for replay.
+    """
+
+    def __init__(self, seed=None, spawn_key=()):
+        self.spawn_key = tuple(spawn_key)
+        self.generators = {}  # Stream name -> Generator
+        self.reseed(seed)
+
+    def reseed(self, seed=None):
+        """Restart every stream from seed, or from fresh OS entropy if seed is None."""
+        self.seed = np.random.SeedSequence(seed).entropy  # Root entropy; pass it back to reproduce a run
+        self.generators.clear()
+
+    def stream(self, name):
+        """Return the Generator of a named subsystem."""
+        generator = self.generators.get(name)
+        if generator is None:
+            sequence = np.random.SeedSequence(self.seed, spawn_key=self.spawn_key + stream_key(name))
+            generator = np.random.Generator(np.random.PCG64(sequence))
+            self.generators[name] = generator
+        return generator
+
+    def worker(self, index):
+        """Return the streams of worker process index; picklable, so it can be sent to the worker."""
+        return RandomStreams(self.seed, self.spawn_key + (WORKER_KEY, index))
+
+    def get_state(self):
+        """Capture the seed and the position of every stream as plain, JSON-friendly data."""
+        return {
+            "seed": self.seed,
+            "spawn_key": list(self.spawn_key),
+            "streams": {name: generator.bit_generator.state
+                        for name, generator in self.generators.items()},
+        }
+
+    def set_state(self, state):
+        """Restore streams captured by get_state, so the same draws happen again."""
+        self.spawn_key = tuple(state["spawn_key"])
+        self.reseed(state["seed"])
+        for name, bit_generator_state in state["streams"].items():
+            self.stream(name).bit_generator.state = bit_generator_state
+
+    def __getstate__(self):
+        return self.get_state()
+
+    def __setstate__(self, state):
+        self.generators = {}
+        self.set_state(state)
@@ -0,0 +1,192 @@
+import numpy as np
+from panda3d.core import (ColorAttrib, Geom, GeomVertexArrayFormat, GeomVertexFormat,
+                          RigidBodyCombiner)
+
+
+def has_color_array(vertex_format):
+    """Return True if a format keeps RGBA uint8 colors in an array of their own."""
+    if not vertex_format.hasColumn("color"):
+        return False
+    color_array = vertex_format.getArray(vertex_format.getArrayWith("color"))
+    color_column = color_array.getColumn("color")
+    return (color_array.getNumColumns() == 1 and color_column.getNumericType() == Geom.NT_uint8
+            and color_column.getNumComponents() == 4)
+
+
+DEFAULT_CHUNK_SIZE = 256  # Particles per combiner; bounds the cost of every rebuild
+
+
+class BatchChunk:
+    """One RigidBodyCombiner holding up to chunk_size particles of a type."""
+
+    def __init__(self, type_root, type_name, index):
+        self.type_name = type_name
+        self.np = type_root.attachNewNode(RigidBodyCombiner(f"{type_name}_batch_{index}"))
+        self.collected_count = 0  # Child count at the last rebuild
+        self.particles = []  # Children at the last rebuild, in row order
+        self.vertex_rows = None  # [(GeomNode, geom index, row of every vertex)], mapped on first recolor
+        self.dirty = False  # Whether the chunk must be rebuilt even if its child count is unchanged
+
+
+class SceneBatcher:
+    """Batches particles by type into chunks of RigidBodyCombiner nodes and keeps static geometry flattened.
+
+    Each particle type gets a root node holding its chunks and a staging
+    node. New particles render from the staging node straight away and are
+    moved into the type's open chunk on the next periodic collect, so
+    spawning never forces a rebuild every frame. A chunk is sealed once it
+    holds chunk_size particles and a new open chunk is started, so a spawn
+    only ever rebuilds one small combiner however large the scene grows;
+    sealed chunks are only rebuilt when particles are removed from them.
+    Batched particles stay ordinary NodePaths that can be moved, but each
+    combiner draws its chunk as a handful of Geoms, so cull and draw
+    traversal no longer grow with the number of particle nodes.
+    """
+
+    def __init__(self, render, task_mgr, collect_interval=0.5, chunk_size=DEFAULT_CHUNK_SIZE,
+                 on_collect=None):
+        self.static_root = render.attachNewNode("static_geometry")
+        self.particle_root = render.attachNewNode("particles")
+        self.type_roots = {}  # Type name -> NodePath holding the type's chunks and staging node
+        self.chunks = {}  # Type name -> BatchChunks of the type, the last one open
+        self.staging = {}  # Type name -> NodePath of particles waiting to be batched
+        self.chunk_size = chunk_size
+        self.chunks_created = 0  # Used to give every chunk a unique name
+        self.on_collect = on_collect  # Called with every BatchChunk after it is rebuilt
+        self.collect_interval = collect_interval  # Seconds between collects
+
+        task_mgr.doMethodLater(collect_interval, self.collect_task, "collect_batches_task")
+
+    def get_type_root(self, type_name):
+        """Return the root node of a particle type, creating its first chunk and staging node if needed."""
+        type_root = self.type_roots.get(type_name)
+        if type_root is None:
+            type_root = self.particle_root.attachNewNode(f"{type_name}_particles")
+            self.type_roots[type_name] = type_root
+            self.staging[type_name] = type_root.attachNewNode(f"{type_name}_staging")
+            self.chunks[type_name] = []
+            self.add_chunk(type_name)
+        return type_root
+
+    def add_chunk(self, type_name):
+        """Start a new open chunk for a type."""
+        chunk = BatchChunk(self.type_roots[type_name], type_name, self.chunks_created)
+        self.chunks_created += 1
+        self.chunks[type_name].append(chunk)
+        return chunk
+
+    def add_particle(self, type_name):
+        """Create an empty particle node for a type; it is batched on the next collect."""
+        self.get_type_root(type_name)
+        return self.staging[type_name].attachNewNode("particle")
+
+    def mark_dirty(self, type_name=None):
+        """Schedule a rebuild of every chunk of one type, or of every type if type_name is None."""
+        type_names = self.chunks if type_name is None else [type_name]
+        for name in type_names:
+            for chunk in self.chunks.get(name, ()):
+                chunk.dirty = True
+
+    def collect(self):
+        """Move staged particles into open chunks and rebuild every chunk that changed."""
+        for type_name, chunks in self.chunks.items():
+            staged = self.staging[type_name].getChildren()
+            open_chunk = chunks[-1]
+            for i in range(staged.getNumPaths()):
+                if open_chunk.np.getNumChildren() >= self.chunk_size:
+                    open_chunk = self.add_chunk(type_name)
+                staged[i].reparentTo(open_chunk.np)
+
+            for chunk in list(chunks):
+                num_children = chunk.np.getNumChildren()
+                # Removed particles only show up as a change in the child count
+                if chunk.dirty or num_children != chunk.collected_count:
+                    self.rebuild(chunk)
+                # Emptied chunks are dropped, except the open one new particles go into
+                if num_children == 0 and chunk is not chunks[-1]:
+                    chunk.np.removeNode()
+                    chunks.remove(chunk)
+
+    def rebuild(self, chunk):
+        """Recombine a chunk's particles into new geometry."""
+        chunk.np.node().collect()
+        # The rebuilt geometry has no color column until map_vertex_rows adds one
+        chunk.np.clearColor()
+        chunk.collected_count = chunk.np.getNumChildren()
+        chunk.particles = list(chunk.np.getChildren())
+        chunk.vertex_rows = None
+        chunk.dirty = False
+        if self.on_collect is not None:
+            self.on_collect(chunk)
+
+    def all_chunks(self):
+        """Every chunk of every type."""
+        return [chunk for chunks in self.chunks.values() for chunk in chunks]
+
+    def map_vertex_rows(self, chunk):
+        """Add a color column to a chunk's combined geometry and find each vertex's particle row.
+
+        The combiner animates each particle's vertices through a transform
+        blend, and every blend wraps the transform of one batched node, which
+        gives the particle each vertex belongs to.
+        """
+        row_of_node = {particle.node().this: row for row, particle in enumerate(chunk.particles)}
+        internal_scene = chunk.np.node().getInternalScene()
+        # The combined scene is usually a single GeomNode, which a "**" search skips
+        geom_nps = list(internal_scene.findAllMatches("**/+GeomNode"))
+        if internal_scene.node().isGeomNode():
+            geom_nps.insert(0, internal_scene)
+        entries = []
+        for geom_np in geom_nps:
+            geom_node = geom_np.node()
+            for i in range(geom_node.getNumGeoms()):
+                vdata = geom_node.modifyGeom(i).modifyVertexData()
+                blend_table = vdata.getTransformBlendTable()
+                if blend_table is None:
+                    continue
+                blend_rows = np.array([
+                    row_of_node.get(blend.getTransform(0).getNode().this, 0)
+                    if blend.getNumTransforms() else 0
+                    for blend in blend_table.getBlends()], dtype=np.intp)
+                vertex_format = vdata.getFormat()
+                blend_array = vertex_format.getArrayWith("transform_blend")
+                blend_column = vertex_format.getColumn("transform_blend")
+                blend_indices = np.ndarray(
+                    shape=(vdata.getNumRows(),), dtype=np.uint16,
+                    buffer=vdata.getArray(blend_array).getHandle().getData(),
+                    offset=blend_column.getStart(),
+                    strides=(vertex_format.getArray(blend_array).getStride(),))
+
+                if not has_color_array(vertex_format):
+                    # Replace any packed or interleaved color with an RGBA array of its own
+                    vertex_format = GeomVertexFormat(vertex_format)
+                    if vertex_format.hasColumn("color"):
+                        vertex_format.removeColumn("color")
+                    vertex_format.addArray(GeomVertexArrayFormat("color", 4, Geom.NT_uint8, Geom.C_color))
+                    vdata.setFormat(GeomVertexFormat.registerFormat(vertex_format))
+                entries.append((geom_node, i, blend_rows[blend_indices]))
+        chunk.vertex_rows = entries
+        chunk.np.setAttrib(ColorAttrib.makeVertex(), 1)
+        return entries
+
+    def set_chunk_colors(self, chunk, colors):
+        """Write one RGBA uint8 color per particle of a chunk, in row order, into its color column."""
+        entries = chunk.vertex_rows
+        if entries is None:
+            entries = self.map_vertex_rows(chunk)
+        for geom_node, i, rows in entries:
+            vdata = geom_node.modifyGeom(i).modifyVertexData()
+            color_array = vdata.getFormat().getArrayWith("color")
+            vertex_colors = np.frombuffer(memoryview(vdata.modifyArray(color_array)), dtype=np.uint8)
+            vertex_colors.reshape(-1, 4)[:] = colors[rows]
+
+    def collect_task(self, task):
+        """Collect changed batches; scheduled every collect_interval seconds."""
+        self.collect()
+        return task.again
+
+    def add_static(self, node):
+        """Attach static geometry and merge it into as few Geoms as possible."""
+        static_np = self.static_root.attachNewNode(node)
+        static_np.flattenStrong()
+        return static_np
@@ -0,0 +1,335 @@
+import bisect
+import json
+
+import numpy as np
+from panda3d.core import ClockObject
+
+
+SESSION_FORMAT_VERSION = 1
+DEFAULT_QUANTUM = 1.0e-3  # Position resolution in world units
+DELTA_DTYPES = (np.int8, np.int16, np.int32)
+
+
+def capture_positions(simulator):
+    """Return {type name: (n, 3) float64 positions} in each type's spawn order."""
+    if simulator.gpu_particles is not None:
+        return {type_name: pool.current_positions()
+                for type_name, pool in simulator.gpu_particles.pools.items()}
+    grouped = {type_name: [] for type_name in simulator.particle_types}
+    for particle in simulator.particles:
+        grouped[particle.getPythonTag("type")].append(tuple(particle.getPos()))
+    return {type_name: np.array(points, dtype=np.float64).reshape(-1, 3)
+            for type_name, points in grouped.items()}
+
+
+def quantize(positions, quantum):
+    """Round positions to integer multiples of quantum."""
+    return np.round(np.asarray(positions) / quantum).astype(np.int32)
+
+
+def narrowest(values):
+    """Store integer values in the smallest signed dtype that holds them."""
+    largest = int(np.abs(values).max()) if values.size else 0
+    for dtype in DELTA_DTYPES:
+        if largest <= np.iinfo(dtype).max:
+            return values.astype(dtype)
+    return values.astype(np.int64)
+
+
+def encode_keyframe(current):
+    """Concatenate {type name: quantized positions} into one array, in type order."""
+    return np.concatenate(list(current.values()))
+
+
+def encode_delta(previous, current):
+    """Encode current relative to previous as (narrowest per-particle deltas, new particles).
+
+    Both are concatenated over every type, in type order. Particles only
+    ever get added between resets, so each type's first len(previous)
+    particles are the ones previous already had.
+    """
+    delta = narrowest(np.concatenate(
+        [current[t][:len(previous[t])] - previous[t] for t in current]))
+    spawned = np.concatenate([current[t][len(previous[t]):] for t in current])
+    return delta, spawned
+
+
+def delta_encodable(previous, current):
+    """Whether current can be encoded as a delta from previous rather than a keyframe.
+
+    Particles only ever get added between resets; a type with fewer
+    particles than before means a reset, so anything else needs a keyframe.
+    """
+    return previous is not None and all(len(current[t]) >= len(previous[t]) for t in current)
+
+
+def split_types(array, counts, type_names):
+    """Split a concatenated array into {type name: rows} by per-type counts."""
+    return dict(zip(type_names, np.split(array, np.cumsum(counts)[:-1])))
+
+
+def apply_delta(previous, delta, spawned, counts):
+    """Decode the quantized positions of a frame from the previous frame and its encoded delta."""
+    type_names = list(previous)
+    previous_counts = [len(previous[t]) for t in type_names]
+    spawned_counts = [n - m for n, m in zip(counts, previous_counts)]
+    deltas = split_types(delta, previous_counts, type_names)
+    spawned = split_types(spawned, spawned_counts, type_names)
+    return {t: np.concatenate((previous[t] + deltas[t], spawned[t])) for t in type_names}
+
+
+def apply_state(simulator, frame, positions):
+    """Put the simulator's clock, grid and particles into a recorded or received state."""
+    simulator.simulation_time = frame["simulation_time"]
+    simulator.simulation_speed = frame["simulation_speed"]
+    if frame["grid_size"] != simulator.current_grid_size:
+        simulator.current_grid_size = frame["grid_size"]
+        simulator.create_grid(frame["grid_size"])
+
+    if simulator.gpu_particles is not None:
+        # Stationary particles: zero directions keep them where they are put
+        simulator.gpu_particles.clear()
+        for type_name, type_positions in positions.items():
+            if len(type_positions):
+                simulator.gpu_particles.spawn(type_name, type_positions,
+                                              np.zeros_like(type_positions))
+        simulator.gpu_particles.advance(0.0, simulator.simulation_speed)
+        return
+
+    existing = {type_name: [] for type_name in positions}
+    for particle in simulator.particles:
+        existing[particle.getPythonTag("type")].append(particle)
+    simulator.particles = []
+    for type_name, type_positions in positions.items():
+        # Reuse the type's particle nodes, adding or removing nodes to match the count
+        count = len(type_positions)
+        for particle in existing[type_name][count:]:
+            particle.removeNode()
+        if len(existing[type_name]) > count:
+            # Particles added later could restore the old count, which alone would skip the rebuild
+            simulator.batcher.mark_dirty(type_name)
+        kept = existing[type_name][:count]
+        simulator.particles.extend(kept)
+        while len(kept) < count:
+            kept.append(simulator.add_particle(type_name, (0.0, 0.0, 0.0), (0.0, 0.0, 0.0)))
+        # Back-date spawn times so the temperature colors see each particle's actual distance
+        spawn_times = (simulator.simulation_time
+                       - np.linalg.norm(type_positions, axis=1) / simulator.expansion_rate)
+        for particle, position, spawn_time in zip(kept, type_positions.tolist(), spawn_times.tolist()):
+            particle.setPos(*position)
+            particle.setPythonTag("spawn_time", spawn_time)
+    if simulator.temperature is not None:
+        simulator.temperature.reload_spawn_times()
+
+
+class SessionRecorder:
+    """Records a session as input events plus keyframed, delta-encoded particle positions.
+
+    Every record_interval seconds the positions of all particles are
+    quantized to integer multiples of quantum. A keyframe stores them in
+    full; the frames in between only store the change of each particle
+    that already existed, in the narrowest integer type that fits, and the
+    quantized positions of particles spawned since. Deltas are taken
+    between quantized values, so decoding is exact and never drifts, however
+    long the run. User actions from SimulationUI are logged with the frame
+    they happened in.
+    """
+
+    def __init__(self, simulator, record_interval=0.1, keyframe_interval=50, quantum=DEFAULT_QUANTUM):
+        self.simulator = simulator
+        self.record_interval = record_interval  # Seconds between recorded frames
+        self.keyframe_interval = keyframe_interval  # Recorded frames per keyframe
+        self.quantum = quantum
+        self.frames = []  # Frame metadata dicts, in time order
+        self.arrays = {}  # "frame/kind" -> encoded positions of every type, concatenated
+        self.events = []  # User actions as dicts
+        self.previous = None  # Quantized positions of the last recorded frame
+        self.force_keyframe = True
+        self.clock = ClockObject.getGlobalClock()
+        self.start_time = self.clock.getFrameTime()
+
+        if simulator.ui is not None:
+            simulator.ui.on_event = self.record_event
+        simulator.taskMgr.doMethodLater(record_interval, self.record_task, "record_session_task")
+
+    def session_time(self):
+        """Seconds since recording started."""
+        return self.clock.getFrameTime() - self.start_time
+
+    def record_task(self, task):
+        """Record a frame; scheduled every record_interval seconds."""
+        self.record_frame(self.session_time())
+        return task.again
+
+    def record_frame(self, time):
+        """Capture every particle's position as a keyframe or as deltas from the last frame."""
+        simulator = self.simulator
+        index = len(self.frames)
+        current = {type_name: quantize(positions, self.quantum)
+                   for type_name, positions in capture_positions(simulator).items()}
+
+        keyframe = (self.force_keyframe or index % self.keyframe_interval == 0
+                    or not delta_encodable(self.previous, current))
+        frame = {
+            "time": time,
+            "simulation_time": simulator.simulation_time,
+            "simulation_speed": simulator.simulation_speed,
+            "paused": simulator.paused,
+            "grid_size": simulator.current_grid_size,
+            "keyframe": keyframe,
+        }
+        # All types share one array per frame, in particle_types order, split by counts
+        frame["counts"] = [len(positions) for positions in current.values()]
+        if keyframe:
+            frame["rng_state"] = simulator.rng.get_state()
+            self.arrays[f"{index}/positions"] = encode_keyframe(current)
+        else:
+            self.arrays[f"{index}/delta"], self.arrays[f"{index}/spawned"] = encode_delta(
+                self.previous, current)
+        self.frames.append(frame)
+        self.previous = current
+        self.force_keyframe = False
+
+    def record_event(self, name):
+        """Log a user action; resets start a new keyframe."""
+        simulator = self.simulator
+        self.events.append({
+            "time": self.session_time(),
+            "frame": len(self.frames),
+            "name": name,
+            "simulation_time": simulator.simulation_time,
+            "simulation_speed": simulator.simulation_speed,
+            "paused": simulator.paused,
+        })
+        if name == "reset_simulation":
+            self.force_keyframe = True
+
+    def storage_size(self):
+        """Bytes of encoded position data recorded so far."""
+        return sum(array.nbytes for array in self.arrays.values())
+
+    def header(self):
+        """Everything about the session except the position arrays, as JSON-friendly data."""
+        return {
+            "version": SESSION_FORMAT_VERSION,
+            "quantum": self.quantum,
+            "seed": self.simulator.rng.seed,
+            "particle_types": list(self.simulator.particle_types),
+            "frames": self.frames,
+            "events": self.events,
+        }
+
+    def save(self, path):
+        """Write the session to a compressed .npz file that SessionPlayback can read lazily."""
+        np.savez_compressed(path, header=np.array(json.dumps(self.header())), **self.arrays)
+
+
+class SessionPlayback:
+    """Decodes a recorded session and seeks to any point in it without running the physics.
+
+    Seeking loads the nearest keyframe at or before the requested time and
+    applies the deltas after it. Seeking forward within the same keyframe
+    span continues from the last decoded frame instead of starting over.
+    """
+
+    def __init__(self, header, arrays):
+        if header["version"] != SESSION_FORMAT_VERSION:
+            raise ValueError(f"Unsupported session format version {header['version']}")
+        self.quantum = header["quantum"]
+        self.seed = header["seed"]
+        self.particle_types = header["particle_types"]
+        self.frames = header["frames"]
+        self.events = header["events"]
+        self.arrays = arrays  # Mapping of "frame/kind" -> array; an NpzFile loads on access
+        self.times = [frame["time"] for frame in self.frames]
+        self.keyframes = [i for i, frame in enumerate(self.frames) if frame["keyframe"]]
+        self.decoded_index = None  # Frame whose quantized positions are in decoded
+        self.decoded = None
+
+    @classmethod
+    def load(cls, path):
+        """Open a session saved by SessionRecorder.save."""
+        arrays = np.load(path)
+        return cls(json.loads(str(arrays["header"])), arrays)
+
+    @classmethod
+    def from_recorder(cls, recorder):
+        """Play back a recording still in memory."""
+        return cls(recorder.header(), recorder.arrays)
+
+    @property
+    def duration(self):
+        return self.times[-1] if self.times else 0.0
+
+    def frame_index(self, time):
+        """Index of the last frame recorded at or before time."""
+        return max(bisect.bisect_right(self.times, time) - 1, 0)
+
+    def decode(self, index):
+        """Return {type name: quantized positions} of frame index."""
+        keyframe = self.keyframes[bisect.bisect_right(self.keyframes, index) - 1]
+        if self.decoded_index is not None and keyframe <= self.decoded_index <= index:
+            start, positions = self.decoded_index + 1, self.decoded
+        else:
+            start = keyframe + 1
+            positions = split_types(self.arrays[f"{keyframe}/positions"],
+                                    self.frames[keyframe]["counts"], self.particle_types)
+        for i in range(start, index + 1):
+            positions = apply_delta(positions, self.arrays[f"{i}/delta"],
+                                    self.arrays[f"{i}/spawned"], self.frames[i]["counts"])
+        self.decoded_index, self.decoded = index, positions
+        return positions
+
+    def state_at(self, time):
+        """Return (frame metadata, {type name: (n, 3) positions}) of the session at time."""
+        index = self.frame_index(time)
+        positions = self.decode(index)
+        return self.frames[index], {type_name: quantized * self.quantum
+                                    for type_name, quantized in positions.items()}
+
+    def events_between(self, start, end):
+        """User actions recorded in the time range (start, end]."""
+        return [event for event in self.events if start < event["time"] <= end]
+
+
+class SessionPlayer:
+    """Shows a recorded session in a live simulator, replacing its physics.
+
+    The simulator is paused so none of its own tasks move particles, and
+    every frame the particles are set to the recorded positions at the
+    current playback time.
+    """
+
+    def __init__(self, simulator, playback, rate=1.0):
+        self.simulator = simulator
+        self.playback = playback
+        self.rate = rate  # Playback seconds per wall clock second
+        self.time = 0.0
+        self.shown_index = None
+        self.clock = ClockObject.getGlobalClock()
+
+        simulator.taskMgr.add(self.playback_task, "session_playback_task")
+
+    def seek(self, time):
+        """Jump to a point in the session."""
+        self.time = min(max(time, 0.0), self.playback.duration)
+        self.show()
+        # A jump replaces many particles; batch and color them now rather than on the next collect
+        self.simulator.batcher.collect()
+
+    def playback_task(self, task):
+        """Advance playback time and show the frame recorded at it."""
+        self.time = min(self.time + self.clock.getDt() * self.rate,
+                        self.playback.duration)
+        if self.playback.frame_index(self.time) != self.shown_index:
+            self.show()
+        return task.cont
+
+    def show(self):
+        """Put the simulator's particles where they were at the current playback time."""
+        simulator = self.simulator
+        frame, positions = self.playback.state_at(self.time)
+        self.shown_index = self.playback.frame_index(self.time)
+
+        simulator.paused = True
+        apply_state(simulator, frame, positions)
@@ -0,0 +1,344 @@
+import argparse
+import socket
+import struct
+
+import numpy as np
+
+from session_recorder import (DEFAULT_QUANTUM, apply_delta, apply_state, capture_positions,
+                              delta_encodable, encode_delta, encode_keyframe, quantize,
+                              split_types)
+
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 47650
+MAX_PENDING_BYTES = 16 * 1024 * 1024  # Viewers further behind than this skip frames
+
+# Every message is a little-endian (payload length, kind) header and a payload
+MESSAGE_HEADER = struct.Struct("<IB")
+KEYFRAME = 1
+DELTA = 2
+COMMAND = 3
+
+# State payload: frame, quantum, simulation time, speed, paused, grid size,
+# number of types, delta item size (0 in keyframes), then one uint32 count
+# per type and the position arrays
+STATE_HEADER = struct.Struct("<IdddBiBB")
+
+# SimulationUI actions a viewer may ask the server to perform
+COMMANDS = ("increase_speed", "decrease_speed", "reset_simulation", "toggle_pause")
+
+# Tasks that move the simulation forward; viewers get their state from the server instead
+PHYSICS_TASKS = ("update_simulation_time_task", "expand_universe_task",
+                 "spawn_particles_task", "update_grid_size_task")
+
+
+def encode_state(kind, frame, arrays):
+    """Pack a keyframe (positions) or delta (delta, spawned) and its frame metadata."""
+    counts = np.asarray(frame["counts"], dtype="<u4")
+    item_size = arrays[0].itemsize if kind == DELTA else 0
+    header = STATE_HEADER.pack(frame["index"], frame["quantum"], frame["simulation_time"],
+                               frame["simulation_speed"], frame["paused"], frame["grid_size"],
+                               len(counts), item_size)
+    return b"".join([header, counts.tobytes()] + [array.astype(array.dtype.newbyteorder("<")).tobytes()
+                                                  for array in arrays])
+
+
+def decode_state(kind, payload, previous_total=0):
+    """Unpack a state payload into (frame metadata, arrays); deltas need the previous particle count."""
+    (index, quantum, simulation_time, simulation_speed, paused, grid_size,
+     num_types, item_size) = STATE_HEADER.unpack_from(payload)
+    offset = STATE_HEADER.size
+    counts = np.frombuffer(payload, dtype="<u4", count=num_types, offset=offset).tolist()
+    offset += 4 * num_types
+    frame = {"index": index, "quantum": quantum, "simulation_time": simulation_time,
+             "simulation_speed": simulation_speed, "paused": bool(paused),
+             "grid_size": grid_size, "counts": counts}
+    if kind == KEYFRAME:
+        return frame, (np.frombuffer(payload, dtype="<i4", offset=offset).reshape(-1, 3),)
+    delta_dtype = np.dtype(f"<i{item_size}")
+    delta = np.frombuffer(payload, dtype=delta_dtype, count=previous_total * 3, offset=offset)
+    offset += delta.nbytes
+    spawned = np.frombuffer(payload, dtype="<i4", offset=offset)
+    return frame, (delta.reshape(-1, 3), spawned.reshape(-1, 3))
+
+
+class Connection:
+    """A non-blocking socket carrying length-prefixed messages in both directions."""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.sock.setblocking(False)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.outgoing = bytearray()
+        self.incoming = bytearray()
+        self.synced = False  # Whether the peer holds the last broadcast state, so deltas apply
+
+    def pending(self):
+        """Bytes queued but not yet accepted by the socket."""
+        return len(self.outgoing)
+
+    def send(self, kind, payload):
+        """Queue a message and send as much as the socket takes without blocking."""
+        self.outgoing += MESSAGE_HEADER.pack(len(payload), kind)
+        self.outgoing += payload
+        self.flush()
+
+    def flush(self):
+        """Send queued bytes until the socket would block."""
+        while self.outgoing:
+            try:
+                sent = self.sock.send(self.outgoing)
+            except BlockingIOError:
+                return
+            del self.outgoing[:sent]
+
+    def receive(self):
+        """Return every complete (kind, payload) message received so far."""
+        while True:
+            try:
+                data = self.sock.recv(65536)
+            except BlockingIOError:
+                break
+            if not data:
+                raise ConnectionError("Connection closed by peer")
+            self.incoming += data
+        messages = []
+        while len(self.incoming) >= MESSAGE_HEADER.size:
+            length, kind = MESSAGE_HEADER.unpack_from(self.incoming)
+            end = MESSAGE_HEADER.size + length
+            if len(self.incoming) < end:
+                break
+            messages.append((kind, bytes(self.incoming[MESSAGE_HEADER.size:end])))
+            del self.incoming[:end]
+        return messages
+
+    def close(self):
+        self.sock.close()
+
+
+class SimulationServer:
+    """Steps the simulation once and broadcasts its particle state to any number of viewers.
+
+    Every broadcast_interval seconds the particle positions are quantized
+    and sent to every viewer as a compact binary delta from the previous
+    broadcast; a viewer that has just connected, fallen too far behind, or
+    missed a reset gets a keyframe instead. The delta is encoded once and
+    shared by every viewer that is in sync. Viewers send back the names of
+    SimulationUI actions, which the server applies to its own simulation.
+    """
+
+    def __init__(self, simulator, host=DEFAULT_HOST, port=DEFAULT_PORT, broadcast_interval=1 / 30,
+                 quantum=DEFAULT_QUANTUM):
+        self.simulator = simulator
+        self.broadcast_interval = broadcast_interval  # Seconds between state broadcasts
+        self.quantum = quantum
+        self.clients = []
+        self.previous = None  # Quantized positions of the last broadcast
+        self.frame_index = 0
+
+        self.listener = socket.create_server((host, port))
+        self.listener.setblocking(False)
+        self.port = self.listener.getsockname()[1]  # The actual port when port 0 was requested
+
+        simulator.taskMgr.add(self.server_task, "simulation_server_task")
+        simulator.taskMgr.doMethodLater(broadcast_interval, self.broadcast_task,
+                                        "simulation_broadcast_task")
+
+    def server_task(self, task):
+        """Accept viewers, apply their commands, and send whatever is still queued for them."""
+        self.accept_clients()
+        for client in list(self.clients):
+            try:
+                for kind, payload in client.receive():
+                    if kind == COMMAND:
+                        self.handle_command(payload.decode("utf-8"))
+                client.flush()
+            except OSError:
+                self.drop(client)
+        return task.cont
+
+    def broadcast_task(self, task):
+        """Broadcast the state; scheduled every broadcast_interval seconds."""
+        self.broadcast()
+        return task.again
+
+    def accept_clients(self):
+        """Accept every pending viewer connection."""
+        while True:
+            try:
+                sock, address = self.listener.accept()
+            except BlockingIOError:
+                return
+            self.clients.append(Connection(sock))
+
+    def handle_command(self, name):
+        """Apply a forwarded SimulationUI action to the server's simulation."""
+        if name in COMMANDS:
+            getattr(self.simulator.ui, name)()
+        else:
+            print(f"Ignoring unknown viewer command '{name}'")
+
+    def broadcast(self):
+        """Send the current state to every viewer, as a delta where the viewer can apply one."""
+        simulator = self.simulator
+        current = {type_name: quantize(positions, self.quantum)
+                   for type_name, positions in capture_positions(simulator).items()}
+        frame = {
+            "index": self.frame_index,
+            "quantum": self.quantum,
+            "simulation_time": simulator.simulation_time,
+            "simulation_speed": simulator.simulation_speed,
+            "paused": simulator.paused,
+            "grid_size": simulator.current_grid_size,
+            "counts": [len(positions) for positions in current.values()],
+        }
+        deltas_valid = delta_encodable(self.previous, current)
+        delta_message = keyframe_message = None
+        for client in list(self.clients):
+            if client.pending() > MAX_PENDING_BYTES:
+                client.synced = False  # Skip this frame; catch up with a keyframe later
+                continue
+            try:
+                if client.synced and deltas_valid:
+                    if delta_message is None:
+                        delta_message = encode_state(DELTA, frame, encode_delta(self.previous, current))
+                    client.send(DELTA, delta_message)
+                else:
+                    if keyframe_message is None:
+                        keyframe_message = encode_state(KEYFRAME, frame, (encode_keyframe(current),))
+                    client.send(KEYFRAME, keyframe_message)
+                    client.synced = True
+            except OSError:
+                self.drop(client)
+        self.previous = current
+        self.frame_index += 1
+
+    def drop(self, client):
+        """Forget a viewer that disconnected."""
+        client.close()
+        self.clients.remove(client)
+
+    def close(self):
+        """Disconnect every viewer and stop listening."""
+        for client in list(self.clients):
+            self.drop(client)
+        self.listener.close()
+
+
+class SimulationViewer:
+    """Renders the state broadcast by a SimulationServer instead of simulating it.
+
+    The viewer's own physics tasks are removed, so it only draws, and its
+    SimulationUI actions are forwarded to the server rather than applied
+    locally; every viewer of one server shows the same frame.
+    """
+
+    def __init__(self, simulator, host=DEFAULT_HOST, port=DEFAULT_PORT, timeout=10.0):
+        self.simulator = simulator
+        self.positions = None  # Quantized positions of the last received state
+        self.frame = None  # Metadata of the last received state
+        self.keyframe_received = False  # Whether a keyframe arrived since the last show
+
+        self.connection = Connection(socket.create_connection((host, port), timeout=timeout))
+        for name in PHYSICS_TASKS:
+            simulator.taskMgr.remove(name)
+        simulator.ui.command_sink = self.send_command
+        simulator.taskMgr.add(self.viewer_task, "simulation_viewer_task")
+
+    def send_command(self, name):
+        """Ask the server to perform a SimulationUI action."""
+        self.connection.send(COMMAND, name.encode("utf-8"))
+
+    def viewer_task(self, task):
+        """Decode every state received since the last frame and show the newest one."""
+        try:
+            messages = self.connection.receive()
+            self.connection.flush()
+        except OSError as e:
+            print(f"Lost connection to the simulation server: {e}")
+            self.connection.close()
+            return task.done
+        for kind, payload in messages:
+            self.receive_state(kind, payload)
+        if messages and self.frame is not None:
+            self.show()
+        return task.cont
+
+    def receive_state(self, kind, payload):
+        """Update the decoded positions from a keyframe or delta message."""
+        type_names = list(self.simulator.particle_types)
+        if kind == KEYFRAME:
+            frame, (positions,) = decode_state(kind, payload)
+            self.positions = split_types(positions, frame["counts"], type_names)
+            self.keyframe_received = True
+        elif kind == DELTA and self.positions is not None:
+            previous_total = sum(len(positions) for positions in self.positions.values())
+            frame, (delta, spawned) = decode_state(kind, payload, previous_total)
+            self.positions = apply_delta(self.positions, delta, spawned, frame["counts"])
+        else:
+            return
+        self.frame = frame
+
+    def show(self):
+        """Put the simulator into the last received state."""
+        quantum = self.frame["quantum"]
+        self.simulator.paused = self.frame["paused"]
+        apply_state(self.simulator, self.frame,
+                    {type_name: positions * quantum for type_name, positions in self.positions.items()})
+        if self.keyframe_received:
+            # Joining or a reset replaces most particles; batch and color them straight away
+            self.keyframe_received = False
+            self.simulator.batcher.collect()
+        self.simulator.ui.update_ui_text()
+
+
+def serve(host, port, seed=None, frame_rate=60):
+    """Run a headless simulation server until interrupted."""
+    from panda3d.core import loadPrcFileData
+    import bigbang_simulator
+
+    bigbang_simulator.use_offscreen_display()
+    loadPrcFileData("", "win-size 1 1")
+    # Nothing waits for vsync offscreen, so cap the step rate instead
+    loadPrcFileData("", "clock-mode limited")
+    loadPrcFileData("", f"clock-frame-rate {frame_rate}")
+
+    # The server never renders, so skip everything that only affects what is drawn
+    simulator = bigbang_simulator.BigBangSimulator(seed=seed, use_gpu_particles=False,
+                                                   show_temperature=False, show_cmb=False)
+    simulator.win.setActive(False)
+    simulator.taskMgr.remove("collect_batches_task")
+    server = SimulationServer(simulator, host, port)
+    print(f"Serving on {host}:{server.port}", flush=True)
+    simulator.run()
+
+
+def view(host, port):
+    """Open a window showing the simulation run by a server."""
+    import bigbang_simulator
+
+    simulator = bigbang_simulator.BigBangSimulator()
+    SimulationViewer(simulator, host, port)
+    simulator.run()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the simulation as a server or as a viewer of one.")
+    subparsers = parser.add_subparsers(dest="mode", required=True)
+    serve_parser = subparsers.add_parser("serve", help="Run a headless simulation server")
+    serve_parser.add_argument("--seed", type=int, default=None, help="Random seed of the simulation")
+    serve_parser.add_argument("--frame-rate", type=int, default=60, help="Simulation steps per second")
+    view_parser = subparsers.add_parser("view", help="Show the simulation of a running server")
+    for subparser in (serve_parser, view_parser):
+        subparser.add_argument("--host", default=DEFAULT_HOST)
+        subparser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args(argv)
+
+    if args.mode == "serve":
+        serve(args.host, args.port, args.seed, args.frame_rate)
+    else:
+        view(args.host, args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,19 +2,47 @@ from direct.gui.OnscreenText import OnscreenText
 from panda3d.core import TextNode
 
 
+STATUS_FORMAT = "Time: {}s | Speed: {}x | Status: {}"
+CONTROLS_TEXT = "Controls: Up/Down Arrows (Speed), R (Reset), P (Pause)"
+
+
+class HudText:
+    """An OnscreenText that is only regenerated when one of its displayed fields changes."""
+
+    def __init__(self, text_node, fields_func, template):
+        self.text_node = text_node  # OnscreenText to render into
+        self.fields_func = fields_func  # Returns a tuple of already-formatted field strings
+        self.template = template
+        self.rendered_fields = None
+
+    def refresh(self):
+        """Re-render the text if its formatted fields changed. Returns True if it did."""
+        fields = self.fields_func()
+        if fields == self.rendered_fields:
+            return False
+        self.rendered_fields = fields
+        self.text_node.setText(self.template.format(*fields))
+        return True
+
+
 class SimulationUI:
     """Handles all UI elements and user controls for the Big Bang Simulator."""
 
-    def __init__(self, simulator):
+    def __init__(self, simulator, refresh_interval=0.1):
         self.simulator = simulator  # Reference to the main simulator
         self.ui_text = None
+        self.controls_text = None
+        self.hud_texts = []  # Every HudText refreshed by update_ui_task
+        self.refresh_interval = refresh_interval  # Seconds between HUD refreshes
+        self.on_event = None  # Called with the name of every user action after it is applied
+        self.command_sink = None  # When set, user actions are sent here instead of applied locally
 
         # Setup UI and controls
         self.setup_ui()
         self.setup_input()
 
         # Start UI update task
-        self.simulator.taskMgr.add(self.update_ui_task, "update_ui_task")
+        self.simulator.taskMgr.doMethodLater(self.refresh_interval, self.update_ui_task, "update_ui_task")
 
     def setup_ui(self):
         """Initialize UI elements."""
@@ -27,19 +55,35 @@ class SimulationUI:
             align=TextNode.ALeft,
             mayChange=True
         )
+        self.status_hud = HudText(self.ui_text, self.status_fields, STATUS_FORMAT)
+        self.hud_texts.append(self.status_hud)
+
+        # The controls line never changes, so it gets its own static node
+        self.controls_text = OnscreenText(
+            text=CONTROLS_TEXT,
+            pos=(-0.8, -0.82), # One line below the status text
+            scale=0.07,
+            fg=(1, 1, 1, 1),
+            align=TextNode.ALeft,
+            mayChange=False
+        )
 
     def update_ui_task(self, task):
-        """Update UI elements periodically."""
-        self.update_ui_text()
-        return task.cont
+        """Refresh the HUD; scheduled every refresh_interval seconds."""
+        for hud_text in self.hud_texts:
+            hud_text.refresh()
+        return task.again
 
-    def update_ui_text(self):
-        """Update the UI text with current simulation status."""
+    def status_fields(self):
+        """Return the status values formatted at the precision they are shown with."""
         pause_status = "Paused" if self.simulator.paused else "Running"
-        self.ui_text.setText(
-            f"Time: {self.simulator.simulation_time:.2f}s | Speed: {self.simulator.simulation_speed:.1f}x | Status: {pause_status}\n"
-            f"Controls: Up/Down Arrows (Speed), R (Reset), P (Pause)"
-        )
+        return (f"{self.simulator.simulation_time:.2f}",
+                f"{self.simulator.simulation_speed:.1f}",
+                pause_status)
+
+    def update_ui_text(self):
+        """Update the status text immediately if any displayed value changed."""
+        self.status_hud.refresh()
 
     def setup_input(self):
         """Setup keyboard input bindings."""
@@ -48,24 +92,51 @@ class SimulationUI:
         self.simulator.accept('r', self.reset_simulation)
         self.simulator.accept('p', self.toggle_pause)
 
+    def notify_event(self, name):
+        """Report a user action to the owner, e.g. a session recorder."""
+        if self.on_event is not None:
+            self.on_event(name)
+
+    def forward(self, name):
+        """Send a user action to command_sink, e.g. a simulation server. Returns True if sent."""
+        if self.command_sink is None:
+            return False
+        self.command_sink(name)
+        return True
+
     def increase_speed(self):
         """Increase simulation speed."""
+        if self.forward("increase_speed"):
+            return
         self.simulator.simulation_speed = min(self.simulator.max_speed,
                                              self.simulator.simulation_speed + self.simulator.speed_increment)
+        self.notify_event("increase_speed")
         self.update_ui_text()
 
     def decrease_speed(self):
         """Decrease simulation speed."""
+        if self.forward("decrease_speed"):
+            return
         self.simulator.simulation_speed = max(self.simulator.min_speed,
                                              self.simulator.simulation_speed - self.simulator.speed_increment)
+        self.notify_event("decrease_speed")
         self.update_ui_text()
 
     def reset_simulation(self):
         """Reset the entire simulation."""
+        if self.forward("reset_simulation"):
+            return
         # Remove all existing particles
         for particle in self.simulator.particles:
             particle.removeNode()
         self.simulator.particles = []
+        # The respawned batches may hold as many particles as before, so force a rebuild
+        self.simulator.batcher.mark_dirty()
+        if self.simulator.gpu_particles is not None:
+            self.simulator.gpu_particles.clear()
+
+        # Replay the same universe from the start
+        self.simulator.rng.reseed(self.simulator.rng.seed)
 
         # Reset simulation time and spawn timer
         self.simulator.simulation_time = 0.0
@@ -78,9 +149,13 @@ class SimulationUI:
 
         # Create initial particles again
         self.simulator.create_initial_particles()
+        self.notify_event("reset_simulation")
         self.update_ui_text()
 
     def toggle_pause(self):
         """Toggle simulation pause state."""
+        if self.forward("toggle_pause"):
+            return
         self.simulator.paused = not self.simulator.paused
+        self.notify_event("toggle_pause")
         self.update_ui_text()
\ No newline at end of file
@@ -0,0 +1,136 @@
+import numpy as np
+from panda3d.core import LColor
+
+
+# Colormap stops from the coolest to the hottest temperature, as (position, RGB)
+COOLING_COLORMAP_STOPS = (
+    (0.0, (0.25, 0.0, 0.0)),   # Deep red
+    (0.3, (0.9, 0.2, 0.0)),    # Red-orange
+    (0.55, (1.0, 0.6, 0.1)),   # Orange
+    (0.8, (1.0, 0.95, 0.75)),  # Yellow-white
+    (1.0, (0.7, 0.85, 1.0)),   # Blue-white
+)
+COLORMAP_SIZE = 256
+
+
+def build_colormap(stops=COOLING_COLORMAP_STOPS, size=COLORMAP_SIZE):
+    """Precompute a (size, 4) uint8 RGBA lookup table by interpolating between color stops."""
+    positions = np.array([position for position, _ in stops], dtype=np.float64)
+    colors = np.array([color for _, color in stops], dtype=np.float64)
+    samples = np.linspace(0.0, 1.0, size)
+    lut = np.empty((size, 4), dtype=np.uint8)
+    for channel in range(3):
+        lut[:, channel] = np.round(np.interp(samples, positions, colors[:, channel]) * 255)
+    lut[:, 3] = 255
+    return lut
+
+
+class TemperatureModel:
+    """Temperature of each particle as the universe expands and cools.
+
+    The universe as a whole expands with simulation time, and every particle
+    additionally cools with its distance from the origin.
+    Temperature falls off as 1 / (expansion factor), like radiation in an
+    expanding universe, and is mapped to a color through a precomputed
+    logarithmic lookup table.
+    """
+
+    def __init__(self, initial_temperature=1.0e4, min_temperature=3.0,
+                 expansion_timescale=100.0, cooling_length=2.0):
+        self.initial_temperature = initial_temperature  # Temperature of a new particle at time 0
+        self.min_temperature = min_temperature  # Temperature mapped to the coolest color
+        self.expansion_timescale = expansion_timescale  # Simulation seconds for the universe to double
+        self.cooling_length = cooling_length  # Distance over which a particle halves its temperature
+        self.colormap = build_colormap()
+        self.log_min = np.log(min_temperature)
+        self.log_range = np.log(initial_temperature) - self.log_min
+
+    def expansion_factor(self, simulation_time, distances):
+        """Combined expansion factor of the universe and of each particle's neighbourhood."""
+        universe = 1.0 + simulation_time / self.expansion_timescale
+        return universe * (1.0 + np.asarray(distances, dtype=np.float64) / self.cooling_length)
+
+    def temperatures(self, simulation_time, distances):
+        """Temperature of every particle given its distance from the origin."""
+        return self.initial_temperature / self.expansion_factor(simulation_time, distances)
+
+    def colors(self, temperatures):
+        """Map temperatures to (n, 4) uint8 colors in a single lookup table gather."""
+        scaled = (np.log(temperatures) - self.log_min) / self.log_range
+        indices = np.clip((scaled * (len(self.colormap) - 1)).astype(np.intp),
+                          0, len(self.colormap) - 1)
+        return self.colormap[indices]
+
+    def colors_for(self, simulation_time, distances):
+        """Colors of every particle given its distance from the origin."""
+        return self.colors(self.temperatures(simulation_time, distances))
+
+
+class TemperatureColorizer:
+    """Recolors every particle by temperature in one vectorized pass per batch.
+
+    On the CPU path each batch chunk's colors are written straight into the
+    color column of its combined geometry; on the GPU path they go into each
+    pool's color buffer. Either way there is one upload per chunk or pool,
+    not one setColor call per particle.
+    """
+
+    def __init__(self, simulator, model=None, refresh_interval=0.25):
+        self.simulator = simulator
+        self.model = model if model is not None else TemperatureModel()
+        self.refresh_interval = refresh_interval  # Seconds between recolors
+        self.spawn_times = {}  # BatchChunk -> spawn simulation time of each of its particles
+
+        simulator.batcher.on_collect = self.on_collect
+        simulator.taskMgr.doMethodLater(refresh_interval, self.update_temperature_task,
+                                        "update_temperature_task")
+
+    def on_collect(self, chunk):
+        """Cache the spawn times of a rebuilt chunk, in row order, and recolor it."""
+        if not chunk.particles:
+            self.spawn_times.pop(chunk, None)  # Emptied chunks are dropped by the batcher
+            return
+        self.spawn_times[chunk] = np.array(
+            [particle.getPythonTag("spawn_time") for particle in chunk.particles], dtype=np.float64)
+        # The rebuild dropped the chunk's colors; don't wait for the next refresh
+        self.color_chunk(chunk)
+
+    def reload_spawn_times(self):
+        """Re-read the spawn times of every batched particle after they were changed in place."""
+        for chunk in self.simulator.batcher.all_chunks():
+            self.on_collect(chunk)
+
+    def update_temperature_task(self, task):
+        """Recolor particles; scheduled every refresh_interval seconds."""
+        self.refresh()
+        return task.again
+
+    def refresh(self):
+        """Recompute every particle's temperature color and upload it."""
+        simulator = self.simulator
+        simulation_time = simulator.simulation_time
+        newborn_color = self.model.colors_for(simulation_time, [0.0])[0]
+
+        if simulator.gpu_particles is not None:
+            for pool in simulator.gpu_particles.pools.values():
+                pool.spawn_color = newborn_color
+                if pool.count:
+                    distances = np.linalg.norm(pool.current_positions(), axis=1)
+                    pool.set_colors(self.model.colors_for(simulation_time, distances))
+            return
+
+        for chunk in self.spawn_times:
+            self.color_chunk(chunk)
+        # Particles waiting to be batched are all newborn
+        for staging in simulator.batcher.staging.values():
+            staging.setColor(LColor(*(newborn_color / 255.0)))
+
+    def color_chunk(self, chunk):
+        """Write the current temperature color of every particle of a CPU-path batch chunk."""
+        simulator = self.simulator
+        simulation_time = simulator.simulation_time
+        # Particles move radially at expansion_rate per unit of simulation time. Removed
+        # particles are drawn until the next rebuild and may predate a reset, so clamp
+        distances = np.maximum(
+            simulator.expansion_rate * (simulation_time - self.spawn_times[chunk]), 0.0)
+        simulator.batcher.set_chunk_colors(chunk, self.model.colors_for(simulation_time, distances))
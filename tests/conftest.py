@@ -1,7 +1,19 @@
+import numpy as np
 import pytest
+from types import SimpleNamespace
 from unittest.mock import Mock, patch
 
 
+class FakePool:
+    """GPU particle pool stand-in whose positions the test sets directly."""
+
+    def __init__(self):
+        self.positions = np.zeros((0, 3))
+
+    def current_positions(self):
+        return self.positions
+
+
 @pytest.fixture
 def mock_panda3d():
     """Fixture to mock Panda3D components for testing."""
@@ -28,4 +40,88 @@ def mock_simulator():
     simulator.initial_grid_size = 50
     simulator.create_grid = Mock()
     simulator.create_initial_particles = Mock()
-    return simulator
\ No newline at end of file
+    return simulator
+
+
+@pytest.fixture
+def make_simulator():
+    """Fixture providing a factory for lightweight simulator stand-ins.
+
+    The stand-ins are on the GPU path with settable FakePool positions, or on
+    the CPU path with gpu=False.
+    """
+    from random_streams import RandomStreams
+
+    def make(types=("type1", "type2"), gpu=True, seed=1):
+        return SimpleNamespace(
+            particle_types={name: {} for name in types},
+            gpu_particles=SimpleNamespace(pools={name: FakePool() for name in types}) if gpu else None,
+            particles=[],
+            add_particle=Mock(),
+            simulation_time=0.0,
+            simulation_speed=1.0,
+            paused=False,
+            current_grid_size=50,
+            rng=RandomStreams(seed),
+            ui=SimpleNamespace(on_event=None),
+            batcher=Mock(),
+            temperature=None,
+            expansion_rate=0.1,
+            taskMgr=Mock())
+    return make
+
+
+@pytest.fixture
+def make_asset_manager():
+    """Fixture providing a factory for AssetManagers on a mock loader and task manager."""
+    from asset_manager import AssetManager
+
+    def make(particle_types=None):
+        loader = Mock()
+        task_mgr = Mock()
+        if particle_types is None:
+            particle_types = {"type1": {}, "type2": {"model": "custom.egg", "texture": "tex.png"}}
+        return AssetManager(loader, task_mgr, particle_types), loader, task_mgr
+    return make
+
+
+@pytest.fixture
+def make_batcher():
+    """Fixture providing a factory for SceneBatchers on a bare render node and a mock task manager."""
+    from panda3d.core import NodePath
+    from scene_batching import SceneBatcher
+
+    def make():
+        render = NodePath("render")
+        task_mgr = Mock()
+        return SceneBatcher(render, task_mgr, collect_interval=0.1), render, task_mgr
+    return make
+
+
+@pytest.fixture
+def make_gsg():
+    """Fixture providing a factory for GraphicsStateGuardian stand-ins with chosen feature support."""
+    def make(glsl=True, compute=True, buffer_texture=True, cube_map=True):
+        gsg = Mock()
+        gsg.getSupportsGlsl.return_value = glsl
+        gsg.getSupportsComputeShaders.return_value = compute
+        gsg.getSupportsBufferTexture.return_value = buffer_texture
+        gsg.getSupportsCubeMap.return_value = cube_map
+        return gsg
+    return make
+
+
+@pytest.fixture
+def make_particle_system():
+    """Fixture providing a factory for GpuParticleSystems on a bare scene graph (no window needed)."""
+    from panda3d.core import GeomNode, NodePath
+    from gpu_particles import GpuParticleSystem
+
+    def make(types=("type1", "type2"), expansion_rate=0.1):
+        render = NodePath("render")
+        roots = {name: render.attachNewNode(name) for name in types}
+        prototypes = {name: NodePath(GeomNode(f"{name}_geom")) for name in types}
+        particle_types = {name: {"scale": 0.5, "color": (1, 0.5, 0, 1)} for name in types}
+        return GpuParticleSystem(roots.__getitem__, prototypes.__getitem__,
+                                 particle_types, expansion_rate)
+    return make
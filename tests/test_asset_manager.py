@@ -0,0 +1,114 @@
+import pytest
+from unittest.mock import Mock
+from panda3d.core import LineSegs, NodePath, Texture
+
+
+def make_model(num_lines=1):
+    """Build a small model NodePath with real geometry."""
+    ls = LineSegs()
+    for i in range(num_lines):
+        ls.moveTo(i, 0, 0)
+        ls.drawTo(i, 1, 0)
+    root = NodePath("model")
+    root.attachNewNode(ls.create())
+    return root
+
+
+class TestAssetManager:
+    """Test cases for the AssetManager class."""
+
+    def test_preload_starts_async_loads(self, make_asset_manager):
+        """Test that every type's model is requested asynchronously at startup."""
+        from asset_manager import ASSET_TASK_CHAIN, DEFAULT_PARTICLE_MODEL
+
+        manager, loader, task_mgr = make_asset_manager()
+
+        task_mgr.setupTaskChain.assert_called_once_with(ASSET_TASK_CHAIN, numThreads=1)
+        model_paths = [call[0][0] for call in loader.loadModel.call_args_list]
+        assert model_paths == [DEFAULT_PARTICLE_MODEL, "custom.egg"]
+        for call in loader.loadModel.call_args_list:
+            assert call[1]['callback'] == manager.on_model_loaded
+
+        # The texture load runs on the asset task chain
+        task_mgr.add.assert_called_once()
+        assert task_mgr.add.call_args[1]['taskChain'] == ASSET_TASK_CHAIN
+        assert not manager.is_ready()
+
+    def test_instances_share_prototype_geometry(self, make_asset_manager):
+        """Test that particles instance one shared GeomNode per type."""
+        manager, loader, task_mgr = make_asset_manager()
+
+        parent_a = NodePath("a")
+        parent_b = NodePath("b")
+        manager.instance("type1", parent_a)
+        manager.instance("type1", parent_b)
+
+        prototype = manager.get_prototype("type1")
+        assert parent_a.getChild(0).node() == prototype.node()
+        assert parent_b.getChild(0).node() == prototype.node()
+
+    def test_model_loaded_swaps_geometry_for_all_instances(self, make_asset_manager):
+        """Test that a loaded model is flattened into the shared GeomNode."""
+        manager, loader, task_mgr = make_asset_manager()
+        parent = NodePath("particle")
+        manager.instance("type1", parent)
+
+        manager.on_model_loaded(make_model(), "type1", "misc/sphere")
+        assert manager.get_prototype("type1").node().getNumGeoms() == 1
+
+        # Swapping in a custom model replaces the geometry in place
+        manager.on_model_loaded(make_model(3), "type1", "custom.egg")
+        assert manager.get_prototype("type1").node().getNumGeoms() == 1
+        assert parent.getChild(0).node().getGeom(0).getVertexData().getNumRows() == 6
+
+    def test_is_ready_after_all_loads(self, make_asset_manager):
+        """Test that pending loads are cleared by their callbacks."""
+        manager, loader, task_mgr = make_asset_manager()
+
+        manager.on_model_loaded(make_model(), "type1", "misc/sphere")
+        manager.on_model_loaded(make_model(), "type2", "custom.egg")
+        assert not manager.is_ready()
+
+        texture = Texture("tex")
+        manager.on_texture_loaded(texture, "type2", "tex.png")
+        assert manager.is_ready()
+        assert manager.textures["type2"] is texture
+
+    def test_missing_assets_keep_previous_geometry(self, make_asset_manager):
+        """Test that failed loads are reported and leave the prototype unchanged."""
+        manager, loader, task_mgr = make_asset_manager()
+        manager.on_model_loaded(make_model(), "type1", "misc/sphere")
+
+        manager.load_model("type1", "missing.egg")
+        manager.on_model_loaded(None, "type1", "missing.egg")
+        manager.on_texture_loaded(None, "type2", "missing.png")
+        manager.on_model_loaded(make_model(), "type2", "custom.egg")
+
+        assert manager.is_ready()
+        assert manager.get_prototype("type1").node().getNumGeoms() == 1
+        assert "type2" not in manager.textures
+
+    def test_texture_task_hands_result_to_main_thread(self, make_asset_manager):
+        """Test that the threaded texture task schedules the apply on the main chain."""
+        manager, loader, task_mgr = make_asset_manager({})
+
+        manager.load_texture_task("type1", "tex.png")
+
+        loader.loadTexture.assert_called_once_with("tex.png", okMissing=True)
+        args, kwargs = task_mgr.add.call_args
+        assert args[0] == manager.on_texture_loaded
+        assert 'taskChain' not in kwargs
+        assert kwargs['extraArgs'] == [loader.loadTexture.return_value, "type1", "tex.png"]
+
+    def test_on_change_called_after_swaps(self):
+        """Test that the owner is told when a type's geometry or texture changes."""
+        from asset_manager import AssetManager
+
+        on_change = Mock()
+        manager = AssetManager(Mock(), Mock(), {"type1": {}}, on_change=on_change)
+
+        manager.on_model_loaded(make_model(), "type1", "misc/sphere")
+        on_change.assert_called_once_with("type1")
+
+        manager.on_texture_loaded(Texture("tex"), "type1", "tex.png")
+        assert on_change.call_count == 2
@@ -0,0 +1,90 @@
+import json
+import pytest
+
+from benchmarks.harness import (percentile, measure, summarize, compare, best_of,
+                                save_baseline, load_baseline, format_table)
+
+
+class TestBenchmarkHarness:
+    """Test cases for the benchmark timing and baseline helpers."""
+
+    def test_percentile_interpolates(self):
+        """Test percentiles on a small known sample."""
+        samples = [4.0, 1.0, 3.0, 2.0, 5.0]
+        assert percentile(samples, 0) == 1.0
+        assert percentile(samples, 50) == 3.0
+        assert percentile(samples, 100) == 5.0
+        assert percentile(samples, 75) == 4.0
+        assert percentile([1.0, 2.0], 50) == pytest.approx(1.5)
+
+    def test_percentile_requires_samples(self):
+        """Test that an empty sample list is rejected."""
+        with pytest.raises(ValueError):
+            percentile([], 50)
+
+    def test_measure_calls_warmup_and_repeat(self):
+        """Test that warmup calls are not timed."""
+        calls = []
+        latencies = measure(lambda: calls.append(1), repeat=5, warmup=2)
+        assert len(calls) == 7
+        assert len(latencies) == 5
+        assert all(latency >= 0 for latency in latencies)
+
+    def test_summarize_reports_throughput(self):
+        """Test summary statistics and items-per-second throughput."""
+        summary = summarize([0.01, 0.01, 0.02, 0.02], items_per_call=100)
+        assert summary["samples"] == 4
+        assert summary["mean_ms"] == pytest.approx(15.0)
+        assert summary["p50_ms"] == pytest.approx(15.0)
+        assert summary["throughput_per_s"] == pytest.approx(400 / 0.06)
+
+    def test_compare_flags_regressions_only(self):
+        """Test that median slowdowns beyond the tolerance are reported."""
+        baseline = {
+            "fast": {"p50_ms": 1.0, "p95_ms": 2.0},
+            "slow": {"p50_ms": 1.0, "p95_ms": 2.0},
+            "jittery": {"p50_ms": 1.0, "p95_ms": 2.0},
+            "removed": {"p50_ms": 1.0, "p95_ms": 2.0},
+        }
+        results = {
+            "fast": {"p50_ms": 1.1, "p95_ms": 1.5},
+            "slow": {"p50_ms": 2.0, "p95_ms": 2.1},
+            "jittery": {"p50_ms": 1.0, "p95_ms": 5.0},
+            "added": {"p50_ms": 100.0, "p95_ms": 100.0},
+        }
+        regressions = compare(results, baseline, tolerance=0.25)
+        assert len(regressions) == 1
+        assert regressions[0].startswith("slow: p50_ms")
+
+    def test_compare_ignores_slowdowns_below_noise_floor(self):
+        """Test that sub-floor slowdowns of fast benchmarks are not regressions."""
+        baseline = {"tiny": {"p50_ms": 0.02}, "small": {"p50_ms": 0.2}}
+        results = {"tiny": {"p50_ms": 0.06}, "small": {"p50_ms": 0.3}}
+
+        assert compare(results, baseline, tolerance=0.25, noise_floor_ms=0.05) == [
+            "small: p50_ms 0.300 > 0.200 (+50%, tolerance 25%)"]
+        assert len(compare(results, baseline, tolerance=0.25, noise_floor_ms=0.0)) == 2
+
+    def test_best_of_keeps_fastest_run(self):
+        """Test that each benchmark keeps the run with the lowest median."""
+        runs = [{"a": {"p50_ms": 2.0}, "b": {"p50_ms": 1.0}},
+                {"a": {"p50_ms": 1.5}, "b": {"p50_ms": 3.0}, "c": {"p50_ms": 4.0}}]
+        assert best_of(runs) == {"a": {"p50_ms": 1.5}, "b": {"p50_ms": 1.0}, "c": {"p50_ms": 4.0}}
+
+    def test_baseline_round_trip(self, tmp_path):
+        """Test that saved baselines load back with environment metadata."""
+        path = tmp_path / "baseline.json"
+        results = {"expand_universe[n=100]": summarize([0.001, 0.002], items_per_call=100)}
+        save_baseline(str(path), results, meta={"display": "p3tinydisplay"})
+
+        assert load_baseline(str(path)) == results
+        meta = json.loads(path.read_text())["meta"]
+        assert meta["display"] == "p3tinydisplay"
+        assert "python" in meta
+
+    def test_format_table_lists_every_result(self):
+        """Test that the text report has one row per benchmark."""
+        results = {"a": summarize([0.001]), "b": summarize([0.002])}
+        table = format_table(results)
+        assert len(table.splitlines()) == 4
+        assert "a " in table and "b " in table
@@ -0,0 +1,144 @@
+import numpy as np
+import pytest
+from unittest.mock import Mock
+from panda3d.core import NodePath
+
+
+class TestCmbField:
+    """Test cases for generating and caching the anisotropy cube map."""
+
+    def test_face_directions_follow_cube_map_convention(self):
+        """Test that each face's centre looks down its own axis."""
+        from cmb_skybox import cube_face_directions
+
+        axes = [(1, 0, 0), (-1, 0, 0), (0, 1, 0), (0, -1, 0), (0, 0, 1), (0, 0, -1)]
+        for face, axis in enumerate(axes):
+            directions = cube_face_directions(face, 3)
+            assert directions.shape == (3, 3, 3)
+            assert directions[1, 1] == pytest.approx(axis)
+            assert np.linalg.norm(directions, axis=-1) == pytest.approx(np.ones((3, 3)))
+
+    def test_field_is_deterministic_per_seed(self):
+        """Test that a seed always gives the same pattern and different seeds differ."""
+        from cmb_skybox import generate_cmb_field
+
+        field = generate_cmb_field(7, 16)
+        assert field.shape == (6, 16, 16)
+        assert field.dtype == np.uint8
+        assert field.min() == 0 and field.max() == 255
+        assert np.array_equal(field, generate_cmb_field(7, 16))
+        assert not np.array_equal(field, generate_cmb_field(8, 16))
+
+    def test_field_is_seamless_across_faces(self):
+        """Test that texels either side of a face edge have similar values."""
+        from cmb_skybox import generate_cmb_field
+
+        field = generate_cmb_field(3, 64).astype(int)
+        # +X and +Z meet along +X's left column and +Z's right column
+        assert np.abs(field[0, :, 0] - field[4, :, -1]).max() < 16
+
+    def test_cache_keyed_by_seed_and_resolution(self, tmp_path, monkeypatch):
+        """Test that a field is generated once and then loaded from disk."""
+        import cmb_skybox
+
+        generate = Mock(wraps=cmb_skybox.generate_cmb_field)
+        monkeypatch.setattr(cmb_skybox, "generate_cmb_field", generate)
+
+        first = cmb_skybox.load_cmb_field(1, 8, str(tmp_path))
+        again = cmb_skybox.load_cmb_field(1, 8, str(tmp_path))
+        assert generate.call_count == 1
+        assert np.array_equal(first, again)
+        assert (tmp_path / "cmb_v1_seed1_res8.npy").exists()
+
+        cmb_skybox.load_cmb_field(2, 8, str(tmp_path))
+        cmb_skybox.load_cmb_field(1, 16, str(tmp_path))
+        assert generate.call_count == 3
+
+    def test_corrupt_cache_regenerated(self, tmp_path):
+        """Test that an unreadable cache file is replaced rather than trusted."""
+        from cmb_skybox import cmb_cache_path, generate_cmb_field, load_cmb_field
+
+        path = cmb_cache_path(str(tmp_path), 1, 8)
+        with open(path, "wb") as cache_file:
+            cache_file.write(b"not a numpy file")
+
+        assert np.array_equal(load_cmb_field(1, 8, str(tmp_path)), generate_cmb_field(1, 8))
+        assert np.array_equal(np.load(path), generate_cmb_field(1, 8))
+
+
+class TestCmbSkybox:
+    """Test cases for the CmbSkybox class."""
+
+    def test_create_falls_back_to_flat_background(self, make_gsg):
+        """Test that create returns None when the skybox can't or shouldn't be drawn."""
+        from cmb_skybox import CmbSkybox
+
+        simulator = Mock()
+        simulator.show_cmb = True
+        simulator.win.getGsg.return_value = make_gsg(glsl=False)
+        assert CmbSkybox.create(simulator) is None
+
+        simulator.win.getGsg.return_value = make_gsg(cube_map=False)
+        assert CmbSkybox.create(simulator) is None
+
+        simulator.win = None
+        assert CmbSkybox.create(simulator) is None
+
+        simulator.win = Mock()
+        simulator.win.getGsg.return_value = make_gsg()
+        simulator.show_cmb = False
+        assert CmbSkybox.create(simulator) is None
+
+    def test_create_uses_simulator_seed_and_resolution(self, make_gsg, monkeypatch):
+        """Test that create builds the pattern the simulator asked for."""
+        import cmb_skybox
+
+        load = Mock(side_effect=lambda seed, resolution, cache_dir:
+                    cmb_skybox.generate_cmb_field(seed, resolution))
+        monkeypatch.setattr(cmb_skybox, "load_cmb_field", load)
+        render = NodePath("render")
+        simulator = Mock(show_cmb=True, temperature=None, render=render,
+                         camera=render.attachNewNode("camera"), cmb_seed=9, cmb_resolution=8)
+        simulator.win.getGsg.return_value = make_gsg()
+
+        skybox = cmb_skybox.CmbSkybox.create(simulator)
+
+        assert (skybox.seed, skybox.resolution) == (9, 8)
+        assert load.call_args[0][:2] == (9, 8)
+
+    def test_skybox_follows_camera(self, tmp_path):
+        """Test that the skybox hangs off the camera and draws first without depth."""
+        from cmb_skybox import CmbSkybox
+        from panda3d.core import Texture
+
+        render = NodePath("render")
+        camera = render.attachNewNode("camera")
+        skybox = CmbSkybox(camera, render, resolution=8, cache_dir=str(tmp_path))
+
+        assert skybox.skybox_np.getParent() == camera
+        assert skybox.skybox_np.getBinName() == "background"
+        assert not skybox.skybox_np.getDepthWrite()
+        assert skybox.anisotropy_texture.getTextureType() == Texture.TT_cube_map
+        assert skybox.anisotropy_texture.getXSize() == 8
+
+    def test_temperature_is_a_uniform(self, tmp_path, monkeypatch):
+        """Test that simulation time only changes a uniform, never the cube map."""
+        import cmb_skybox
+        from temperature import TemperatureModel
+
+        render = NodePath("render")
+        model = TemperatureModel(initial_temperature=1000.0, expansion_timescale=10.0)
+        skybox = cmb_skybox.CmbSkybox(render.attachNewNode("camera"), render, model,
+                                      resolution=8, cache_dir=str(tmp_path))
+        generate = Mock()
+        monkeypatch.setattr(cmb_skybox, "generate_cmb_field", generate)
+        texture = skybox.anisotropy_texture
+
+        simulator = Mock()
+        simulator.simulation_time = 10.0
+        task = Mock()
+        assert skybox.update_temperature_task(simulator, task) == task.cont
+
+        assert skybox.params[0] == pytest.approx(500.0)
+        assert skybox.anisotropy_texture == texture
+        generate.assert_not_called()
@@ -0,0 +1,327 @@
+import subprocess
+import sys
+import textwrap
+
+import numpy as np
+import pytest
+from unittest.mock import Mock
+
+
+class TestComputeSupport:
+    """Test cases for choosing between the GPU and CPU particle paths."""
+
+    def test_compute_shaders_supported(self, make_gsg):
+        """Test that every required GPU feature is checked."""
+        from gpu_particles import compute_shaders_supported
+
+        assert compute_shaders_supported(make_gsg())
+        assert not compute_shaders_supported(make_gsg(compute=False))
+        assert not compute_shaders_supported(make_gsg(buffer_texture=False))
+        assert not compute_shaders_supported(make_gsg(glsl=False))
+        assert not compute_shaders_supported(None)
+
+    def test_create_falls_back_to_cpu(self, make_gsg):
+        """Test that create returns None when the GPU path can't or shouldn't be used."""
+        from gpu_particles import GpuParticleSystem
+
+        simulator = Mock()
+        simulator.use_gpu_particles = True
+        simulator.win.getGsg.return_value = make_gsg(compute=False)
+        assert GpuParticleSystem.create(simulator) is None
+
+        simulator.win = None
+        assert GpuParticleSystem.create(simulator) is None
+
+        simulator.win = Mock()
+        simulator.win.getGsg.return_value = make_gsg()
+        simulator.use_gpu_particles = False
+        assert GpuParticleSystem.create(simulator) is None
+
+
+class TestGpuParticleSystem:
+    """Test cases for the CPU-side bookkeeping of the GPU particle system."""
+
+    def test_spawn_queues_upload(self, make_particle_system):
+        """Test that spawned particles are stamped and uploaded on advance."""
+        system = make_particle_system()
+        system.spawn("type1", (0.1, 0.0, 0.0), (1.0, 0.0, 0.0))
+        system.spawn("type1", (0.0, 0.1, 0.0), (0.0, 1.0, 0.0))
+        system.spawn("type2", (0.0, 0.0, 0.1), (0.0, 0.0, 1.0))
+
+        pool = system.pools["type1"]
+        assert system.count == 3
+        assert pool.count == 2
+        assert pool.stamps[:3].tolist() == [1, 1, 0]
+        assert system.dirty_pools == {pool, system.pools["type2"]}
+
+        system.advance(0.1, 2.0)
+        assert system.dirty_pools == set()
+        uploaded = np.frombuffer(memoryview(pool.stamp_texture.getRamImage()), dtype=np.uint32)
+        assert uploaded[:3].tolist() == [1, 1, 0]
+        assert list(system.params) == pytest.approx([0.1, 0.1, 2.0])
+        assert not pool.draw_np.isStashed()
+
+    def test_set_colors_uploads_color_buffer_only(self, make_particle_system):
+        """Test that recoloring uploads the color buffer without resending seeds."""
+        system = make_particle_system()
+        system.spawn("type1", (0.1, 0.0, 0.0), (1.0, 0.0, 0.0))
+        system.spawn("type1", (0.0, 0.1, 0.0), (0.0, 1.0, 0.0))
+        pool = system.pools["type1"]
+        assert pool.colors[:2].tolist() == [[255, 128, 0, 255]] * 2
+        system.advance(0.1, 1.0)
+
+        colors = np.array([[10, 20, 30, 255], [40, 50, 60, 255]], dtype=np.uint8)
+        pool.set_colors(colors)
+        assert system.dirty_pools == {pool}
+        assert pool.colors_dirty and not pool.seeds_dirty
+
+        system.advance(0.1, 1.0)
+        uploaded = np.frombuffer(memoryview(pool.color_texture.getRamImage()), dtype=np.uint8)
+        assert uploaded.reshape(-1, 4)[:2].tolist() == colors.tolist()
+
+    def test_positions_reconstructed_from_travel(self, make_particle_system):
+        """Test that CPU-side positions follow the shared travel distance."""
+        system = make_particle_system(expansion_rate=0.5)
+        system.spawn("type1", (0.1, 0.0, 0.0), (1.0, 0.0, 0.0))
+        system.advance(1.0, 2.0)  # Travel 1.0
+        system.spawn("type2", (0.0, -0.1, 0.0), (0.0, -1.0, 0.0))
+        system.advance(1.0, 4.0)  # Travel 3.0 in total
+
+        assert system.travel == pytest.approx(3.0)
+        assert system.pools["type1"].current_positions()[0] == pytest.approx([3.1, 0.0, 0.0])
+        assert system.pools["type2"].current_positions()[0] == pytest.approx([0.0, -2.1, 0.0])
+        assert system.max_extent() == pytest.approx(3.1)
+
+    def test_paused_frame_does_not_travel(self, make_particle_system):
+        """Test that a zero dt leaves every particle where it was."""
+        system = make_particle_system()
+        system.spawn("type1", (0.1, 0.0, 0.0), (1.0, 0.0, 0.0))
+        system.advance(0.0, 5.0)
+        assert system.travel == 0.0
+        assert system.max_extent() == pytest.approx(0.1)
+
+    def test_resize_reseeds_current_positions(self, make_particle_system):
+        """Test that growing a pool keeps particles at their current positions."""
+        from gpu_particles import INITIAL_CAPACITY
+
+        system = make_particle_system(types=("type1",), expansion_rate=1.0)
+        pool = system.pools["type1"]
+        for _ in range(INITIAL_CAPACITY):
+            system.spawn("type1", (0.0, 0.0, 0.1), (0.0, 0.0, 1.0))
+        system.advance(1.0, 1.0)
+        before = pool.current_positions().copy()
+
+        system.spawn("type1", (0.1, 0.0, 0.0), (1.0, 0.0, 0.0))
+
+        assert pool.capacity == 2 * INITIAL_CAPACITY
+        assert pool.count == INITIAL_CAPACITY + 1
+        assert np.allclose(pool.current_positions()[:INITIAL_CAPACITY], before)
+        # Reseeded slots get fresh stamps so the GPU restarts them from the new seeds
+        assert (pool.stamps[:INITIAL_CAPACITY] == 2).all()
+        assert pool.stamps[INITIAL_CAPACITY] == 1
+
+    def test_respawned_slots_restamped_exactly(self, make_particle_system):
+        """Test that a reused slot always gets a different integer stamp, even across 2**32."""
+        from gpu_particles import next_stamps
+
+        system = make_particle_system(types=("type1",))
+        pool = system.pools["type1"]
+        system.spawn("type1", np.full((3, 3), 0.1), np.full((3, 3), 1.0))
+        system.clear()
+        system.spawn("type1", np.full((2, 3), 0.1), np.full((2, 3), 1.0))
+        assert pool.stamps[:3].tolist() == [2, 2, 1]
+
+        stamps = np.array([2**24, 2**24 + 1, 2**32 - 1], dtype=np.uint32)
+        assert next_stamps(stamps).tolist() == [2**24 + 1, 2**24 + 2, 1]
+
+    def test_max_extent_bounds_without_scanning(self, make_particle_system):
+        """Test that the extent bound covers every particle without reconstructing positions."""
+        system = make_particle_system(types=("type1",), expansion_rate=1.0)
+        pool = system.pools["type1"]
+        rng = np.random.default_rng(3)
+        for _ in range(5):
+            positions = rng.uniform(-0.1, 0.1, size=(20, 3))
+            system.spawn("type1", positions,
+                         positions / np.linalg.norm(positions, axis=1, keepdims=True))
+            system.advance(0.5, 1.0)
+        true_extent = np.abs(pool.current_positions()).max()
+
+        pool.current_positions = Mock(side_effect=AssertionError("scanned every particle"))
+        assert true_extent <= system.max_extent() <= true_extent + 2.5
+
+    def test_clear_hides_pools(self, make_particle_system):
+        """Test that clearing removes every particle and stops the dispatch."""
+        system = make_particle_system()
+        system.spawn("type1", (0.1, 0.0, 0.0), (1.0, 0.0, 0.0))
+        system.advance(0.1, 1.0)
+        system.clear()
+
+        assert system.count == 0
+        assert system.max_extent() == 0.0
+        for pool in system.pools.values():
+            assert pool.compute_np.isStashed()
+            assert pool.draw_np.isStashed()
+
+    def test_dispatch_matches_count(self, make_particle_system):
+        """Test that the compute dispatch covers every particle."""
+        from gpu_particles import WORK_GROUP_SIZE
+
+        system = make_particle_system(types=("type1",))
+        pool = system.pools["type1"]
+        for _ in range(WORK_GROUP_SIZE + 1):
+            system.spawn("type1", (0.1, 0.0, 0.0), (1.0, 0.0, 0.0))
+        system.advance(0.1, 1.0)
+
+        assert tuple(pool.compute_np.node().getDispatch(0)) == (2, 1, 1)
+
+
+GPU_CHECK_SCRIPT = textwrap.dedent("""
+    import sys
+    import numpy as np
+    from benchmarks.suite import create_headless_simulator
+
+    simulator = create_headless_simulator("p3headlessgl")
+    system = simulator.gpu_particles
+    if system is None:
+        print("UNSUPPORTED")
+        sys.exit(0)
+    for frame in range(5):
+        system.advance(0.1, 5.0)
+        simulator.graphicsEngine.renderFrame()
+
+    def max_error():
+        error = 0.0
+        for pool in system.pools.values():
+            simulator.graphicsEngine.extractTextureData(pool.position_texture, simulator.win.getGsg())
+            gpu = np.frombuffer(memoryview(pool.position_texture.getRamImage()), dtype=np.float32)
+            gpu = gpu.reshape(-1, 4)[:pool.count, :3]
+            error = max(error, float(np.abs(gpu - pool.current_positions()).max()))
+        return error
+
+    # Fill fresh slots, then reuse them after a reset and grow past the first allocation
+    errors = []
+    for spawns in (3000, 6000):
+        for _ in range(spawns):
+            simulator.spawn_new_particle()
+        for frame in range(5):
+            system.advance(0.1, 5.0)
+            simulator.graphicsEngine.renderFrame()
+        errors.append(max_error())
+        system.clear()
+    print("MAX_ERROR", max(errors))
+""")
+
+
+def test_compute_shader_matches_cpu_model():
+    """Run the compute path on a headless GL context and compare against the CPU model."""
+    import os
+
+    result = subprocess.run([sys.executable, "-c", GPU_CHECK_SCRIPT], capture_output=True,
+                            text=True, timeout=300,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    if "MAX_ERROR" not in result.stdout:
+        pytest.skip("No headless GL context with compute shader support available")
+    error = float(result.stdout.split("MAX_ERROR")[1].split()[0])
+    assert error < 1e-5
+
+
+SHADING_CHECK_SCRIPT = textwrap.dedent("""
+    import sys
+    import numpy as np
+    from panda3d.core import (Geom, GeomNode, GeomTriangles, GeomVertexData, GeomVertexFormat,
+                              GeomVertexWriter, NodePath, Texture)
+    import bigbang_simulator
+    from benchmarks.suite import clear_particles
+
+    gpu = sys.argv[1] == "gpu"
+    bigbang_simulator.use_offscreen_display("p3headlessgl")
+    simulator = bigbang_simulator.BigBangSimulator(seed=1, use_gpu_particles=gpu,
+                                                   show_temperature=False, show_cmb=False)
+    if gpu and simulator.gpu_particles is None:
+        print("UNSUPPORTED")
+        sys.exit(0)
+    while not simulator.assets.is_ready():
+        simulator.taskMgr.step()
+    for name in ("update_simulation_time_task", "expand_universe_task", "spawn_particles_task",
+                 "update_grid_size_task", "update_ui_task", "collect_batches_task"):
+        simulator.taskMgr.remove(name)
+    clear_particles(simulator)
+    simulator.aspect2d.hide()
+    if simulator.grid_node is not None:
+        simulator.grid_node.hide()
+    simulator.camera.setPos(0, -10, 0)
+    simulator.camera.lookAt(0, 0, 0)
+
+    # A unit sphere with normals, so the lights shade it, and a red/blue texture across it
+    vdata = GeomVertexData("sphere", GeomVertexFormat.getV3n3t2(), Geom.UH_static)
+    vertices, normals, texcoords = (GeomVertexWriter(vdata, column)
+                                    for column in ("vertex", "normal", "texcoord"))
+    rings, segments = 16, 32
+    for ring in range(rings + 1):
+        theta = np.pi * ring / rings
+        for segment in range(segments + 1):
+            phi = 2 * np.pi * segment / segments
+            point = (np.sin(theta) * np.cos(phi), np.sin(theta) * np.sin(phi), np.cos(theta))
+            vertices.addData3(*point)
+            normals.addData3(*point)
+            texcoords.addData2(segment / segments, ring / rings)
+    triangles = GeomTriangles(Geom.UH_static)
+    for ring in range(rings):
+        for segment in range(segments):
+            a = ring * (segments + 1) + segment
+            b = a + segments + 1
+            triangles.addVertices(a, b, a + 1)
+            triangles.addVertices(a + 1, b, b + 1)
+    geom = Geom(vdata)
+    geom.addPrimitive(triangles)
+    model = NodePath("model")
+    model.attachNewNode(GeomNode("sphere")).node().addGeom(geom)
+    simulator.assets.set_geometry("type1", model)
+    texture = Texture("red_blue")
+    texture.setup2dTexture(2, 1, Texture.T_unsigned_byte, Texture.F_rgba8)
+    texture.setRamImage(bytes([0, 0, 255, 255, 255, 0, 0, 255]))  # BGRA
+    texture.setMagfilter(Texture.FT_nearest)
+    simulator.assets.get_prototype("type1").setTexture(texture, 1)
+
+    if gpu:
+        system = simulator.gpu_particles
+        system.spawn("type1", (0.0, 0.0, 0.0), (1.0, 0.0, 0.0))
+        system.pools["type1"].set_colors(np.array([[255, 255, 255, 255]], dtype=np.uint8))
+        system.pools["type1"].draw_np.setShaderInput("particle_scale", 1.0)
+        system.advance(0.0, 1.0)
+    else:
+        simulator.add_particle("type1", (0.0, 0.0, 0.0), (1.0, 0.0, 0.0)).setScale(1.0)
+        simulator.batcher.get_type_root("type1").setColor(1, 1, 1, 1)
+        simulator.batcher.collect()
+    for frame in range(3):
+        simulator.graphicsEngine.renderFrame()
+    screenshot = simulator.win.getScreenshot()
+    image = np.frombuffer(screenshot.getRamImageAs("RGB").getData(), dtype=np.uint8)
+    np.save(sys.argv[2], image.reshape(screenshot.getYSize(), screenshot.getXSize(), 3))
+    print("SAVED")
+""")
+
+
+def test_instanced_shading_matches_cpu_path(tmp_path):
+    """Render a lit, textured particle on both paths on a headless GL context and compare."""
+    import os
+
+    images = {}
+    for path in ("gpu", "cpu"):
+        output = tmp_path / f"{path}.npy"
+        result = subprocess.run([sys.executable, "-c", SHADING_CHECK_SCRIPT, path, str(output)],
+                                capture_output=True, text=True, timeout=300,
+                                cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        if "SAVED" not in result.stdout:
+            pytest.skip("No headless GL context with compute shader support available")
+        images[path] = np.load(output).astype(np.int16)
+
+    gpu, cpu = images["gpu"], images["cpu"]
+    covered = cpu.sum(axis=2) > 0
+    assert covered.any()
+    assert np.array_equal(gpu.sum(axis=2) > 0, covered)
+    # The lights shade the white sphere and the red/blue texture tints it
+    assert gpu[covered, 2].max() - gpu[covered, 2].min() > 100
+    assert gpu[covered, 1].max() == 0
+    # Per-pixel lighting only differs from per-vertex lighting by a few levels
+    assert np.abs(gpu - cpu).max() <= 16
@@ -0,0 +1,152 @@
+import json
+import multiprocessing
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from unittest.mock import Mock
+
+import numpy as np
+import pytest
+
+
+def draw_worker_batch(streams, count):
+    """Draw a batch in a worker process from the streams handed to it."""
+    return streams.stream("physics").standard_normal(count)
+
+
+class TestRandomStreams:
+    """Test cases for the RandomStreams class."""
+
+    def test_same_seed_same_numbers(self):
+        """Test that a seed reproduces every stream exactly."""
+        from random_streams import RandomStreams
+
+        a, b = RandomStreams(42), RandomStreams(42)
+        assert np.array_equal(a.stream("spawning").random(100), b.stream("spawning").random(100))
+        assert not np.array_equal(RandomStreams(43).stream("spawning").random(100),
+                                  RandomStreams(42).stream("spawning").random(100))
+
+    def test_unseeded_runs_record_their_seed(self):
+        """Test that an unseeded run can be reproduced from its recorded seed."""
+        from random_streams import RandomStreams
+
+        streams = RandomStreams()
+        draws = streams.stream("types").random(10)
+        assert np.array_equal(RandomStreams(streams.seed).stream("types").random(10), draws)
+
+    def test_streams_are_independent(self):
+        """Test that drawing from one subsystem never shifts another."""
+        from random_streams import RandomStreams
+
+        quiet = RandomStreams(7)
+        busy = RandomStreams(7)
+        busy.stream("physics").random(1000)
+        busy.stream("types").random(3)
+        assert np.array_equal(quiet.stream("spawning").random(10), busy.stream("spawning").random(10))
+        assert not np.array_equal(RandomStreams(7).stream("physics").random(10),
+                                  RandomStreams(7).stream("spawning").random(10))
+
+    def test_stream_keys_do_not_collide(self):
+        """Test that no stream name or worker index aliases another stream."""
+        from random_streams import RandomStreams
+
+        streams = RandomStreams(1)
+        draws = [streams.stream("a").random(4), streams.stream("ab").random(4),
+                 streams.worker(0).stream("a").random(4), streams.worker(1).stream("a").random(4),
+                 streams.worker(0).worker(0).stream("a").random(4)]
+        assert len({tuple(d) for d in draws}) == len(draws)
+
+    def test_reseed_restarts_streams(self):
+        """Test that reseeding with the same seed replays the same draws."""
+        from random_streams import RandomStreams
+
+        streams = RandomStreams(5)
+        first = streams.stream("spawning").random(10)
+        streams.reseed(streams.seed)
+        assert np.array_equal(streams.stream("spawning").random(10), first)
+
+    def test_state_round_trip(self):
+        """Test that a captured state, even through JSON, resumes every stream where it was."""
+        from random_streams import RandomStreams
+
+        streams = RandomStreams(9)
+        streams.stream("types").random(17)
+        streams.stream("spawning").random(3)
+        state = json.loads(json.dumps(streams.get_state()))
+        expected = (streams.stream("types").random(5), streams.stream("spawning").random(5))
+
+        restored = RandomStreams()
+        restored.set_state(state)
+        assert restored.seed == streams.seed
+        assert np.array_equal(restored.stream("types").random(5), expected[0])
+        assert np.array_equal(restored.stream("spawning").random(5), expected[1])
+
+        unpickled = pickle.loads(pickle.dumps(streams))
+        assert np.array_equal(unpickled.stream("types").random(5), streams.stream("types").random(5))
+
+    def test_worker_processes_are_bit_identical(self):
+        """Test that worker streams give the same results in other processes as in this one."""
+        from random_streams import RandomStreams
+
+        streams = RandomStreams(2024)
+        workers = [streams.worker(index) for index in range(2)]
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=2, mp_context=context) as executor:
+            remote = list(executor.map(draw_worker_batch, workers, [1000, 1000]))
+
+        local = [draw_worker_batch(RandomStreams(2024).worker(index), 1000) for index in range(2)]
+        assert all(np.array_equal(r, l) for r, l in zip(remote, local))
+        assert not np.array_equal(local[0], local[1])
+
+
+@pytest.fixture
+def make_spawning_simulator(make_simulator):
+    """Fixture providing a factory for CPU-path stand-ins with four particle types and a fixed seed."""
+    return lambda: make_simulator(("type1", "type2", "type3", "type4"), gpu=False, seed=1234)
+
+
+class TestSpawnParticles:
+    """Test cases for vectorized particle spawning on BigBangSimulator."""
+
+    def spawned(self, simulator):
+        """Every particle passed to add_particle, as (type, position, direction)."""
+        return [call.args for call in simulator.add_particle.call_args_list]
+
+    def test_vectorized_spawning_matches_one_by_one(self, make_spawning_simulator):
+        """Test that one batch of n particles is bit-identical to n single spawns."""
+        from bigbang_simulator import BigBangSimulator
+
+        batch = make_spawning_simulator()
+        BigBangSimulator.spawn_particles(batch, 50)
+        single = make_spawning_simulator()
+        for _ in range(50):
+            BigBangSimulator.spawn_particles(single, 1)
+
+        assert self.spawned(batch) == self.spawned(single)
+        assert len({args[0] for args in self.spawned(batch)}) == 4
+
+    def test_particles_move_outward(self, make_spawning_simulator):
+        """Test that positions stay near the origin and directions are unit vectors away from it."""
+        from bigbang_simulator import BigBangSimulator
+
+        simulator = make_spawning_simulator()
+        BigBangSimulator.spawn_particles(simulator, 20)
+        for type_name, position, direction in self.spawned(simulator):
+            assert max(abs(c) for c in position) <= 0.1
+            assert abs(np.linalg.norm(direction) - 1.0) < 1e-12
+            assert np.dot(position, direction) > 0
+
+    def test_gpu_spawn_grouped_by_type(self, make_spawning_simulator):
+        """Test that the GPU path gets one array upload per type with the same draws."""
+        from bigbang_simulator import BigBangSimulator
+
+        cpu = make_spawning_simulator()
+        BigBangSimulator.spawn_particles(cpu, 30)
+        gpu = make_spawning_simulator()
+        gpu.gpu_particles = Mock()
+        BigBangSimulator.spawn_particles(gpu, 30)
+
+        for call in gpu.gpu_particles.spawn.call_args_list:
+            type_name, positions, directions = call.args
+            expected = [args[1] for args in self.spawned(cpu) if args[0] == type_name]
+            assert positions.tolist() == expected
+        assert sum(len(call.args[1]) for call in gpu.gpu_particles.spawn.call_args_list) == 30
@@ -0,0 +1,210 @@
+import numpy as np
+import pytest
+from unittest.mock import Mock
+from panda3d.core import ColorAttrib, GeomVertexReader, LineSegs, RigidBodyCombiner
+
+
+def make_lines():
+    """Build a GeomNode with a single line segment."""
+    ls = LineSegs()
+    ls.moveTo(0, 0, 0)
+    ls.drawTo(0, 1, 0)
+    return ls.create()
+
+
+class TestSceneBatcher:
+    """Test cases for the SceneBatcher class."""
+
+    def test_initialization(self, make_batcher):
+        """Test that batch roots are created and the collect task is registered."""
+        batcher, render, task_mgr = make_batcher()
+
+        assert batcher.static_root.getParent() == render
+        assert batcher.particle_root.getParent() == render
+        task_mgr.doMethodLater.assert_called_once_with(
+            0.1, batcher.collect_task, "collect_batches_task")
+
+    def test_particles_staged_by_type(self, make_batcher):
+        """Test that new particles are staged under their type until collected."""
+        batcher, render, task_mgr = make_batcher()
+
+        a = batcher.add_particle("type1")
+        b = batcher.add_particle("type1")
+        c = batcher.add_particle("type2")
+
+        assert a.getParent() == b.getParent() == batcher.staging["type1"]
+        assert c.getParent() == batcher.staging["type2"]
+        chunk = batcher.chunks["type1"][0]
+        assert chunk.np.getParent() == batcher.get_type_root("type1")
+        assert isinstance(chunk.np.node(), RigidBodyCombiner)
+
+    def test_collect_moves_staged_particles_into_batches(self, make_batcher):
+        """Test that collect batches staged particles and keeps their NodePaths valid."""
+        batcher, render, task_mgr = make_batcher()
+        a = batcher.add_particle("type1")
+        a.setPos(1, 2, 3)
+        b = batcher.add_particle("type2")
+
+        batcher.collect()
+
+        assert a.getParent() == batcher.chunks["type1"][0].np
+        assert b.getParent() == batcher.chunks["type2"][0].np
+        assert a.getPos(render) == (1, 2, 3)
+        assert batcher.staging["type1"].getNumChildren() == 0
+        assert [chunk.collected_count for chunk in batcher.all_chunks()] == [1, 1]
+
+    def test_collect_only_changed_batches(self, make_batcher):
+        """Test that collect rebuilds dirty chunks and chunks whose children changed."""
+        batcher, render, task_mgr = make_batcher()
+        batcher.add_particle("type1")
+        particle = batcher.add_particle("type2")
+        batcher.collect()
+
+        batcher.rebuild = Mock(wraps=batcher.rebuild)
+        batcher.collect()
+        batcher.rebuild.assert_not_called()
+
+        # A removed particle changes the child count and forces a rebuild
+        particle.removeNode()
+        batcher.collect()
+        batcher.rebuild.assert_called_once_with(batcher.chunks["type2"][0])
+        assert batcher.chunks["type2"][0].collected_count == 0
+
+        # Marking a type dirty rebuilds it even without child changes
+        batcher.rebuild.reset_mock()
+        batcher.mark_dirty("type1")
+        batcher.collect()
+        batcher.rebuild.assert_called_once_with(batcher.chunks["type1"][0])
+        assert not any(chunk.dirty for chunk in batcher.all_chunks())
+
+    def test_mark_dirty(self, make_batcher):
+        """Test marking one type or every type for a rebuild."""
+        batcher, render, task_mgr = make_batcher()
+        batcher.get_type_root("type1")
+        batcher.get_type_root("type2")
+
+        batcher.mark_dirty("type1")
+        assert [chunk.dirty for chunk in batcher.all_chunks()] == [True, False]
+        batcher.mark_dirty()
+        assert [chunk.dirty for chunk in batcher.all_chunks()] == [True, True]
+
+    def test_full_chunks_sealed(self, make_batcher):
+        """Test that spawning only ever rebuilds the open chunk once earlier chunks are full."""
+        batcher, render, task_mgr = make_batcher()
+        batcher.chunk_size = 4
+        for _ in range(10):
+            batcher.add_particle("type1")
+        batcher.collect()
+
+        chunks = batcher.chunks["type1"]
+        assert [chunk.collected_count for chunk in chunks] == [4, 4, 2]
+
+        batcher.rebuild = Mock(wraps=batcher.rebuild)
+        batcher.add_particle("type1")
+        batcher.collect()
+        batcher.rebuild.assert_called_once_with(chunks[2])
+
+        # Filling the open chunk starts a new one
+        batcher.add_particle("type1")
+        batcher.add_particle("type1")
+        batcher.collect()
+        assert [chunk.collected_count for chunk in chunks] == [4, 4, 4, 1]
+
+    def test_emptied_chunks_dropped(self, make_batcher):
+        """Test that chunks whose particles were all removed go away, except the open one."""
+        batcher, render, task_mgr = make_batcher()
+        batcher.chunk_size = 2
+        particles = [batcher.add_particle("type1") for _ in range(5)]
+        batcher.collect()
+        first, second, last = batcher.chunks["type1"]
+
+        for particle in particles[:2] + particles[4:]:
+            particle.removeNode()
+        batcher.collect()
+
+        assert batcher.chunks["type1"] == [second, last]
+        assert first.np.isEmpty()
+        assert last.collected_count == 0
+
+    def test_on_collect_reports_chunk_rows(self, make_batcher):
+        """Test that a rebuild reports the chunk with its particles in row order."""
+        on_collect = Mock()
+        batcher, render, task_mgr = make_batcher()
+        batcher.on_collect = on_collect
+        a = batcher.add_particle("type1")
+        b = batcher.add_particle("type1")
+
+        batcher.collect()
+
+        chunk = on_collect.call_args[0][0]
+        assert chunk.type_name == "type1"
+        assert chunk.particles == [a, b]
+
+    def test_set_chunk_colors_writes_color_column(self, make_batcher):
+        """Test that per-particle colors land on exactly that particle's vertices."""
+        batcher, render, task_mgr = make_batcher()
+        particles = []
+        for i in range(3):
+            particle = batcher.add_particle("type1")
+            particle.attachNewNode(make_lines())
+            particle.setX(i)
+            particles.append(particle)
+        batcher.collect()
+        chunk = batcher.chunks["type1"][0]
+
+        colors = np.array([[255, 0, 0, 255], [0, 255, 0, 255], [0, 0, 255, 255]], dtype=np.uint8)
+        batcher.set_chunk_colors(chunk, colors)
+
+        internal = chunk.np.node().getInternalScene()
+        vdata = internal.node().getGeom(0).getVertexData()
+        reader = GeomVertexReader(vdata, "color")
+        vertex_colors = []
+        while not reader.isAtEnd():
+            vertex_colors.append(tuple(round(c * 255) for c in reader.getData4()))
+        # Two vertices per particle, in chunk row order
+        assert sorted(set(vertex_colors)) == sorted(tuple(c) for c in colors.tolist())
+        assert len(vertex_colors) == 6
+        assert chunk.np.getAttrib(ColorAttrib).getColorType() == ColorAttrib.T_vertex
+
+    def test_rebuild_drops_vertex_color_override(self, make_batcher):
+        """Test that a rebuilt chunk falls back to its flat color until it is recolored."""
+        batcher, render, task_mgr = make_batcher()
+        batcher.get_type_root("type1")
+        chunk = batcher.chunks["type1"][0]
+        for x in (1, 2):
+            particle = batcher.add_particle("type1")
+            particle.attachNewNode(make_lines())
+            particle.setX(x)
+            batcher.collect()
+            batcher.set_chunk_colors(chunk, np.full((x, 4), 255, dtype=np.uint8))
+            assert chunk.np.hasColor()
+
+        batcher.add_particle("type1").attachNewNode(make_lines())
+        batcher.collect()
+
+        assert not chunk.np.hasColor()
+        assert chunk.vertex_rows is None
+
+    def test_collect_task_reschedules(self, make_batcher):
+        """Test that the collect task collects and asks to run again after its interval."""
+        batcher, render, task_mgr = make_batcher()
+        mock_task = Mock()
+        mock_task.again = "again"
+
+        batcher.collect = Mock()
+        assert batcher.collect_task(mock_task) == "again"
+        batcher.collect.assert_called_once_with()
+
+    def test_add_static_flattens_geometry(self, make_batcher):
+        """Test that static geometry is merged into a single Geom."""
+        batcher, render, task_mgr = make_batcher()
+
+        ls = LineSegs()
+        ls.moveTo(0, 0, 0)
+        ls.drawTo(1, 0, 0)
+        ls.moveTo(0, 1, 0)
+        ls.drawTo(1, 1, 0)
+        static_np = batcher.add_static(ls.create())
+
+        assert static_np.getParent() == batcher.static_root
+        assert static_np.node().getNumGeoms() == 1
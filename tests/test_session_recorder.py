@@ -0,0 +1,200 @@
+import numpy as np
+import pytest
+from unittest.mock import Mock
+from panda3d.core import NodePath
+
+
+def make_recorder(simulator, **kwargs):
+    from session_recorder import SessionRecorder
+
+    recorder = SessionRecorder(simulator, **kwargs)
+    recorder.clock = Mock()
+    recorder.clock.getFrameTime.return_value = 0.0
+    recorder.start_time = 0.0
+    return recorder
+
+
+def record_run(simulator, recorder, frames=25):
+    """Move and spawn particles frame by frame, returning the true positions of each frame."""
+    rng = np.random.default_rng(0)
+    pools = simulator.gpu_particles.pools
+    truth = []
+    for i in range(frames):
+        for pool in pools.values():
+            pool.positions = np.concatenate((pool.positions * 1.01 + 0.002,
+                                             rng.uniform(-0.1, 0.1, size=(i % 3, 3))))
+        simulator.simulation_time = i * 0.5
+        recorder.record_frame(i * 0.1)
+        truth.append({name: pool.positions.copy() for name, pool in pools.items()})
+    return truth
+
+
+class TestSessionRecorder:
+    """Test cases for the SessionRecorder class."""
+
+    def test_initialization(self, make_simulator):
+        """Test that the recorder hooks UI events and registers its task."""
+        simulator = make_simulator()
+        recorder = make_recorder(simulator)
+
+        assert simulator.ui.on_event == recorder.record_event
+        simulator.taskMgr.doMethodLater.assert_called_once_with(
+            recorder.record_interval, recorder.record_task, "record_session_task")
+
+    def test_record_task_reschedules(self, make_simulator):
+        """Test that the task records one frame and asks to run again after its interval."""
+        recorder = make_recorder(make_simulator())
+        task = Mock()
+        task.again = "again"
+
+        assert recorder.record_task(task) == "again"
+        assert len(recorder.frames) == 1
+
+    def test_keyframes_and_narrow_deltas(self, make_simulator):
+        """Test that frames between keyframes only hold small deltas and new particles."""
+        simulator = make_simulator()
+        recorder = make_recorder(simulator, keyframe_interval=10)
+        truth = record_run(simulator, recorder)
+
+        assert [i for i, frame in enumerate(recorder.frames) if frame["keyframe"]] == [0, 10, 20]
+        assert "rng_state" in recorder.frames[10]
+        assert recorder.arrays["1/delta"].dtype == np.int8
+        assert recorder.arrays["10/positions"].dtype == np.int32
+        assert recorder.frames[5]["counts"] == [len(truth[5]["type1"]), len(truth[5]["type2"])]
+        full_snapshots = sum(frame["counts"][0] + frame["counts"][1]
+                             for frame in recorder.frames) * 3 * 4
+        assert recorder.storage_size() < full_snapshots / 2
+
+    def test_removed_particles_force_keyframe(self, make_simulator):
+        """Test that a frame with fewer particles than the last is stored in full."""
+        simulator = make_simulator()
+        recorder = make_recorder(simulator)
+        pool = simulator.gpu_particles.pools["type1"]
+        pool.positions = np.ones((5, 3))
+        recorder.record_frame(0.0)
+        recorder.record_frame(0.1)
+        pool.positions = np.ones((2, 3))
+        recorder.record_frame(0.2)
+
+        assert [frame["keyframe"] for frame in recorder.frames] == [True, False, True]
+
+    def test_delta_encodable(self):
+        """Test that deltas need a previous frame and no type that lost particles."""
+        from session_recorder import delta_encodable
+
+        previous = {"type1": np.zeros((2, 3)), "type2": np.zeros((1, 3))}
+        assert delta_encodable(previous, {"type1": np.zeros((3, 3)), "type2": np.zeros((1, 3))})
+        assert not delta_encodable(previous, {"type1": np.zeros((3, 3)), "type2": np.zeros((0, 3))})
+        assert not delta_encodable(None, previous)
+
+    def test_events_logged_and_reset_keyframed(self, make_simulator):
+        """Test that user actions are logged against the frame they happened in."""
+        simulator = make_simulator()
+        recorder = make_recorder(simulator)
+        recorder.record_frame(0.0)
+        simulator.simulation_speed = 2.0
+        recorder.clock.getFrameTime.return_value = 0.05
+        simulator.ui.on_event("increase_speed")
+        recorder.record_frame(0.1)
+        simulator.ui.on_event("reset_simulation")
+        recorder.record_frame(0.2)
+
+        assert [(event["name"], event["frame"]) for event in recorder.events] == [
+            ("increase_speed", 1), ("reset_simulation", 2)]
+        assert recorder.events[0]["simulation_speed"] == 2.0
+        assert recorder.events[0]["time"] == pytest.approx(0.05)
+        assert [frame["keyframe"] for frame in recorder.frames] == [True, False, True]
+
+    def test_capture_cpu_particles_by_type(self, make_simulator):
+        """Test that CPU particles are grouped by type in spawn order."""
+        from session_recorder import capture_positions
+
+        simulator = make_simulator()
+        simulator.gpu_particles = None
+        for i, type_name in enumerate(("type1", "type2", "type1")):
+            particle = NodePath("particle")
+            particle.setPythonTag("type", type_name)
+            particle.setPos(i, 0, 0)
+            simulator.particles.append(particle)
+
+        positions = capture_positions(simulator)
+        assert positions["type1"].tolist() == [[0, 0, 0], [2, 0, 0]]
+        assert positions["type2"].tolist() == [[1, 0, 0]]
+
+
+class TestSessionPlayback:
+    """Test cases for decoding and seeking recorded sessions."""
+
+    def test_seek_round_trip_through_file(self, tmp_path, make_simulator):
+        """Test that seeking anywhere, in any order, gives positions within half a quantum."""
+        from session_recorder import SessionPlayback
+
+        simulator = make_simulator()
+        recorder = make_recorder(simulator, keyframe_interval=10)
+        truth = record_run(simulator, recorder)
+        recorder.save(tmp_path / "session.npz")
+
+        playback = SessionPlayback.load(tmp_path / "session.npz")
+        assert playback.duration == pytest.approx(2.4)
+        for index in (24, 3, 4, 12, 11, 0, 19, 20, 7):
+            frame, positions = playback.state_at(index * 0.1 + 0.05)
+            assert frame["simulation_time"] == index * 0.5
+            for type_name, expected in truth[index].items():
+                assert positions[type_name].shape == expected.shape
+                assert np.allclose(positions[type_name], expected, rtol=0, atol=recorder.quantum / 2 + 1e-12)
+
+    def test_events_between(self, make_simulator):
+        """Test that events are selected by playback time."""
+        from session_recorder import SessionPlayback
+
+        simulator = make_simulator()
+        recorder = make_recorder(simulator)
+        recorder.record_frame(0.0)
+        for time, name in ((0.5, "toggle_pause"), (1.5, "toggle_pause")):
+            recorder.clock.getFrameTime.return_value = time
+            recorder.record_event(name)
+
+        playback = SessionPlayback.from_recorder(recorder)
+        assert [event["time"] for event in playback.events_between(0.0, 1.0)] == [0.5]
+        assert len(playback.events_between(0.5, 2.0)) == 1
+
+    def test_rejects_unknown_version(self):
+        """Test that files from another format version are refused."""
+        from session_recorder import SessionPlayback
+
+        with pytest.raises(ValueError):
+            SessionPlayback({"version": 999}, {})
+
+
+class TestSessionPlayer:
+    """Test cases for showing a session in a simulator."""
+
+    def test_show_cpu_particles(self, make_simulator):
+        """Test that playback pauses the simulator and puts CPU particles at recorded positions."""
+        from session_recorder import SessionPlayback, SessionPlayer, capture_positions
+
+        recorded = make_simulator()
+        recorder = make_recorder(recorded, keyframe_interval=10)
+        truth = record_run(recorded, recorder, frames=12)
+
+        viewer = make_simulator()
+        viewer.gpu_particles = None
+        viewer.create_grid = Mock()
+
+        def add_particle(type_name, position, direction):
+            particle = NodePath("particle")
+            particle.setPythonTag("type", type_name)
+            viewer.particles.append(particle)
+            return particle
+        viewer.add_particle = add_particle
+
+        player = SessionPlayer(viewer, SessionPlayback.from_recorder(recorder))
+        for index in (11, 4):
+            player.seek(index * 0.1)
+            assert viewer.paused
+            assert viewer.simulation_time == index * 0.5
+            shown = capture_positions(viewer)
+            for type_name, expected in truth[index].items():
+                assert np.allclose(shown[type_name], expected, rtol=0, atol=1e-3)
+        # Seeking back removed particles, so their batches get rebuilt
+        viewer.batcher.mark_dirty.assert_any_call("type1")
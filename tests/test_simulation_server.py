@@ -0,0 +1,300 @@
+import os
+import subprocess
+import sys
+import time
+import warnings
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+import numpy as np
+import pytest
+from panda3d.core import GeomVertexReader, LineSegs, NodePath
+
+@pytest.fixture
+def make_viewer_simulator(make_simulator):
+    """Fixture providing a factory for CPU-path simulator stand-ins that create real particle nodes."""
+    def make(types=("type1", "type2")):
+        simulator = make_simulator(types, gpu=False)
+        simulator.create_grid = Mock()
+        simulator.ui = SimpleNamespace(command_sink=None, update_ui_text=Mock())
+
+        def add_particle(type_name, position, direction):
+            particle = NodePath("particle")
+            particle.setPythonTag("type", type_name)
+            simulator.particles.append(particle)
+            return particle
+        simulator.add_particle = add_particle
+        return simulator
+    return make
+
+
+@pytest.fixture
+def make_colored_viewer_simulator(make_viewer_simulator, make_batcher):
+    """Fixture providing a factory for CPU-path simulator stand-ins with real batches colored by temperature."""
+    from temperature import TemperatureColorizer
+
+    def make(types=("type1", "type2")):
+        simulator = make_viewer_simulator(types)
+        simulator.batcher, render, task_mgr = make_batcher()
+
+        def add_particle(type_name, position, direction):
+            lines = LineSegs()
+            lines.moveTo(0, 0, 0)
+            lines.drawTo(0, 0.1, 0)
+            particle = simulator.batcher.add_particle(type_name)
+            particle.attachNewNode(lines.create())
+            particle.setScale(0.5)
+            particle.setPythonTag("spawn_time", simulator.simulation_time)
+            particle.setPythonTag("type", type_name)
+            simulator.particles.append(particle)
+            return particle
+        simulator.add_particle = add_particle
+        simulator.temperature = TemperatureColorizer(simulator)
+        return simulator
+    return make
+
+
+def batch_colors(simulator, type_name):
+    """Return the set of RGBA vertex colors drawn by a type's batch chunks."""
+    colors = set()
+    for chunk in simulator.batcher.chunks[type_name]:
+        internal = chunk.np.node().getInternalScene()
+        for i in range(internal.node().getNumGeoms()):
+            reader = GeomVertexReader(internal.node().getGeom(i).getVertexData(), "color")
+            while not reader.isAtEnd():
+                colors.add(tuple(round(c * 255) for c in reader.getData4()))
+    return colors
+
+
+def shown_positions(simulator):
+    from session_recorder import capture_positions
+
+    return capture_positions(simulator)
+
+
+def pump(server, viewers, until, timeout=5.0):
+    """Run the server and viewer tasks until until() is true."""
+    task = SimpleNamespace(cont="cont", again="again", done="done")
+    deadline = time.monotonic() + timeout
+    while not until():
+        assert time.monotonic() < deadline, "Timed out waiting for the viewers"
+        if server is not None:
+            server.server_task(task)
+            server.broadcast_task(task)
+        for viewer in viewers:
+            viewer.viewer_task(task)
+        time.sleep(0.001)
+
+
+class TestStateEncoding:
+    """Test cases for the binary state messages."""
+
+    def test_keyframe_round_trip(self):
+        """Test that a keyframe decodes to the same metadata and positions."""
+        from simulation_server import KEYFRAME, decode_state, encode_state
+
+        positions = np.arange(12, dtype=np.int32).reshape(4, 3) - 6
+        frame = {"index": 7, "quantum": 0.001, "simulation_time": 1.5, "simulation_speed": 5.0,
+                 "paused": True, "grid_size": 70, "counts": [3, 1]}
+        decoded, (decoded_positions,) = decode_state(KEYFRAME, encode_state(KEYFRAME, frame, (positions,)))
+
+        assert decoded == frame
+        assert np.array_equal(decoded_positions, positions)
+
+    def test_delta_is_compact(self):
+        """Test that deltas travel in their narrow type, far smaller than positions."""
+        from session_recorder import encode_delta
+        from simulation_server import DELTA, KEYFRAME, STATE_HEADER, decode_state, encode_state
+
+        previous = {"type1": np.full((1000, 3), 5000, dtype=np.int32)}
+        current = {"type1": np.concatenate((previous["type1"] + 3, [[1, 2, 3]])).astype(np.int32)}
+        frame = {"index": 1, "quantum": 0.001, "simulation_time": 0.0, "simulation_speed": 1.0,
+                 "paused": False, "grid_size": 50, "counts": [1001]}
+        payload = encode_state(DELTA, frame, encode_delta(previous, current))
+
+        assert len(payload) == STATE_HEADER.size + 4 + 1000 * 3 + 3 * 4
+        decoded, (delta, spawned) = decode_state(DELTA, payload, previous_total=1000)
+        assert np.all(delta == 3)
+        assert spawned.tolist() == [[1, 2, 3]]
+
+
+class TestClientServer:
+    """Test cases for a server and viewers talking over localhost sockets."""
+
+    def make_server(self, simulator):
+        from simulation_server import SimulationServer
+
+        return SimulationServer(simulator, port=0)
+
+    def move(self, simulator, steps=1):
+        """Advance the stand-in server's particles and spawn a few more."""
+        for pool in simulator.gpu_particles.pools.values():
+            for _ in range(steps):
+                pool.positions = np.concatenate((pool.positions * 1.05 + 0.01,
+                                                 np.full((2, 3), 0.05)))
+        simulator.simulation_time += steps
+
+    def test_tasks_registered(self, make_simulator):
+        """Test that the network task runs every frame and broadcasts are scheduled."""
+        simulator = make_simulator()
+        server = self.make_server(simulator)
+        try:
+            simulator.taskMgr.add.assert_called_once_with(server.server_task, "simulation_server_task")
+            simulator.taskMgr.doMethodLater.assert_called_once_with(
+                server.broadcast_interval, server.broadcast_task, "simulation_broadcast_task")
+        finally:
+            server.close()
+
+    def test_viewers_stay_in_sync(self, make_simulator, make_viewer_simulator):
+        """Test that viewers joining at different times all show the server's state."""
+        from simulation_server import SimulationViewer
+
+        simulator = make_simulator()
+        server = self.make_server(simulator)
+        try:
+            first = SimulationViewer(make_viewer_simulator(), port=server.port)
+            pump(server, [first], lambda: first.frame is not None)
+            self.move(simulator, 3)
+            second = SimulationViewer(make_viewer_simulator(), port=server.port)
+            for _ in range(3):
+                self.move(simulator)
+                index = server.frame_index
+                pump(server, [first, second], lambda: all(
+                    v.frame is not None and v.frame["index"] == index for v in (first, second)))
+
+            for viewer in (first, second):
+                assert viewer.simulator.simulation_time == simulator.simulation_time
+                shown = shown_positions(viewer.simulator)
+                for type_name, pool in simulator.gpu_particles.pools.items():
+                    assert np.allclose(shown[type_name], pool.positions, rtol=0, atol=0.0005 + 1e-6)
+            # Physics tasks are stopped on viewers
+            first.simulator.taskMgr.remove.assert_any_call("expand_universe_task")
+        finally:
+            server.close()
+
+    def test_reset_sends_keyframe(self, make_simulator, make_viewer_simulator):
+        """Test that fewer particles than before reach viewers as a keyframe."""
+        from simulation_server import SimulationViewer
+
+        simulator = make_simulator()
+        server = self.make_server(simulator)
+        try:
+            viewer = SimulationViewer(make_viewer_simulator(), port=server.port)
+            self.move(simulator, 4)
+            pump(server, [viewer], lambda: viewer.frame is not None)
+            for pool in simulator.gpu_particles.pools.values():
+                pool.positions = pool.positions[:1]
+            index = server.frame_index
+            pump(server, [viewer], lambda: viewer.frame["index"] == index)
+            assert [len(p) for p in viewer.positions.values()] == [1, 1]
+        finally:
+            server.close()
+
+    def test_viewer_colors_follow_positions(self, make_simulator, make_colored_viewer_simulator):
+        """Test that every viewer colors particles by their received distance, not by join time."""
+        from simulation_server import SimulationViewer
+
+        simulator = make_simulator()
+        simulator.simulation_time = 100.0  # Late enough that stale spawn times would go far negative
+        server = self.make_server(simulator)
+        try:
+            first = SimulationViewer(make_colored_viewer_simulator(), port=server.port)
+            self.move(simulator, 3)
+            pump(server, [first], lambda: first.frame is not None)
+            self.move(simulator, 5)
+            second = SimulationViewer(make_colored_viewer_simulator(), port=server.port)
+            index = server.frame_index
+            pump(server, [first, second], lambda: all(
+                v.frame is not None and v.frame["index"] == index for v in (first, second)))
+            for viewer in (first, second):
+                viewer.simulator.batcher.collect()
+
+            model = first.simulator.temperature.model
+            for type_name in simulator.gpu_particles.pools:
+                positions = first.positions[type_name] * first.frame["quantum"]
+                expected = model.colors_for(simulator.simulation_time, np.linalg.norm(positions, axis=1))
+                assert batch_colors(first.simulator, type_name) == {tuple(c) for c in expected.tolist()}
+                assert batch_colors(second.simulator, type_name) == batch_colors(first.simulator, type_name)
+
+            # A reset moves reused particles back inward; none may end up with a negative distance
+            for pool in simulator.gpu_particles.pools.values():
+                pool.positions = np.full((2, 3), 0.05)
+            simulator.simulation_time = 0.0
+            index = server.frame_index
+            with warnings.catch_warnings():
+                warnings.simplefilter("error")
+                pump(server, [first], lambda: first.frame["index"] == index)
+                first.simulator.batcher.collect()
+                first.simulator.temperature.refresh()
+            newborn = model.colors_for(0.0, [np.linalg.norm([0.05] * 3)])[0]
+            assert batch_colors(first.simulator, "type1") == {tuple(newborn.tolist())}
+        finally:
+            server.close()
+
+    def test_commands_forwarded_to_server(self, make_simulator, make_viewer_simulator):
+        """Test that viewer UI actions run on the server, and unknown ones are ignored."""
+        from simulation_server import SimulationViewer
+
+        simulator = make_simulator()
+        simulator.ui = Mock()
+        server = self.make_server(simulator)
+        try:
+            viewer_simulator = make_viewer_simulator()
+            viewer = SimulationViewer(viewer_simulator, port=server.port)
+            viewer_simulator.ui.command_sink("toggle_pause")
+            viewer.send_command("remove_everything")
+            pump(server, [viewer], lambda: simulator.ui.toggle_pause.called)
+            simulator.ui.remove_everything.assert_not_called()
+        finally:
+            server.close()
+
+    def test_disconnected_viewer_dropped(self, make_simulator, make_viewer_simulator):
+        """Test that the server forgets viewers that went away."""
+        from simulation_server import SimulationViewer
+
+        simulator = make_simulator()
+        server = self.make_server(simulator)
+        try:
+            viewer = SimulationViewer(make_viewer_simulator(), port=server.port)
+            pump(server, [viewer], lambda: viewer.frame is not None)
+            viewer.connection.close()
+            pump(server, [], lambda: not server.clients)
+        finally:
+            server.close()
+
+
+def test_headless_server_process(make_viewer_simulator):
+    """Run the real server in its own process and drive it from two viewers on localhost."""
+    from simulation_server import SimulationViewer
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    server = subprocess.Popen([sys.executable, "simulation_server.py", "serve", "--port", "0",
+                               "--seed", "5"], cwd=root, stdout=subprocess.PIPE,
+                              stderr=subprocess.DEVNULL, text=True)
+    try:
+        port = None
+        for line in server.stdout:
+            if line.startswith("Serving on"):
+                port = int(line.rsplit(":", 1)[1])
+                break
+        if port is None:
+            pytest.skip("Headless simulation server could not start")
+
+        viewers = [SimulationViewer(make_viewer_simulator(("type1", "type2", "type3", "type4")),
+                                    port=port) for _ in range(2)]
+        pump(None, viewers, lambda: all(v.frame is not None and v.frame["index"] > 3 for v in viewers),
+             timeout=30.0)
+        assert not viewers[0].frame["paused"]
+
+        viewers[1].simulator.ui.command_sink("toggle_pause")
+        pump(None, viewers, lambda: all(v.frame["paused"] for v in viewers), timeout=30.0)
+        # Once paused nothing moves, so both viewers settle on the same state
+        index = max(v.frame["index"] for v in viewers) + 2
+        pump(None, viewers, lambda: all(v.frame["index"] >= index for v in viewers), timeout=30.0)
+        shown = [shown_positions(v.simulator) for v in viewers]
+        assert sum(len(p) for p in shown[0].values()) > 0
+        for type_name in shown[0]:
+            assert np.array_equal(shown[0][type_name], shown[1][type_name])
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
@@ -27,8 +27,9 @@ class TestSimulationUI:
         mock_simulator.accept.assert_any_call('r', ui.reset_simulation)
         mock_simulator.accept.assert_any_call('p', ui.toggle_pause)
 
-        # Verify UI update task was added
-        mock_simulator.taskMgr.add.assert_called_once()
+        # Verify UI update task was scheduled
+        mock_simulator.taskMgr.doMethodLater.assert_called_once_with(
+            ui.refresh_interval, ui.update_ui_task, "update_ui_task")
 
     def test_setup_ui(self):
         """Test UI element setup."""
@@ -40,14 +41,20 @@ class TestSimulationUI:
         with patch('simulation_ui.OnscreenText') as mock_text:
             ui = SimulationUI(mock_simulator)
 
-            # Verify OnscreenText was created with correct parameters
-            mock_text.assert_called_once()
-            call_args = mock_text.call_args
-            assert call_args[1]['text'] == "Time: 0.00s | Speed: 1.0x"
-            assert call_args[1]['pos'] == (-0.8, -0.75)
-            assert call_args[1]['scale'] == 0.07
-            assert call_args[1]['fg'] == (1, 1, 1, 1)
-            assert call_args[1]['mayChange'] == True
+            # Verify the status and controls texts were created
+            assert mock_text.call_count == 2
+            status_args = mock_text.call_args_list[0][1]
+            assert status_args['text'] == "Time: 0.00s | Speed: 1.0x"
+            assert status_args['pos'] == (-0.8, -0.75)
+            assert status_args['scale'] == 0.07
+            assert status_args['fg'] == (1, 1, 1, 1)
+            assert status_args['mayChange'] == True
+
+            # The controls line is static and never regenerated
+            controls_args = mock_text.call_args_list[1][1]
+            assert controls_args['text'] == "Controls: Up/Down Arrows (Speed), R (Reset), P (Pause)"
+            assert controls_args['mayChange'] == False
+            assert ui.controls_text is mock_text.return_value
 
     def test_update_ui_task(self):
         """Test UI update task."""
@@ -58,13 +65,14 @@ class TestSimulationUI:
 
         ui = SimulationUI(mock_simulator)
         mock_task = Mock()
-        mock_task.cont = "cont"
+        mock_task.again = "again"
 
-        with patch.object(ui, 'update_ui_text') as mock_update:
+        with patch.object(ui.status_hud, 'refresh') as mock_refresh:
             result = ui.update_ui_task(mock_task)
 
-            mock_update.assert_called_once()
-            assert result == "cont"
+            mock_refresh.assert_called_once()
+            # Rescheduled refresh_interval seconds later
+            assert result == "again"
 
     def test_update_ui_text_running(self):
         """Test UI text update when simulation is running."""
@@ -85,8 +93,7 @@ class TestSimulationUI:
 
         # Verify correct text was set
         ui.ui_text.setText.assert_called_once_with(
-            "Time: 123.46s | Speed: 2.5x | Status: Running\n"
-            "Controls: Up/Down Arrows (Speed), R (Reset), P (Pause)"
+            "Time: 123.46s | Speed: 2.5x | Status: Running"
         )
 
     def test_update_ui_text_paused(self):
@@ -105,10 +112,39 @@ class TestSimulationUI:
         ui.update_ui_text()
 
         ui.ui_text.setText.assert_called_once_with(
-            "Time: 0.00s | Speed: 1.0x | Status: Paused\n"
-            "Controls: Up/Down Arrows (Speed), R (Reset), P (Pause)"
+            "Time: 0.00s | Speed: 1.0x | Status: Paused"
         )
 
+    def test_update_ui_text_skips_unchanged_values(self):
+        """Test that the text is only regenerated when a displayed value changes."""
+        from simulation_ui import SimulationUI
+
+        mock_simulator = Mock()
+        mock_simulator.taskMgr = Mock()
+        mock_simulator.simulation_time = 1.0
+        mock_simulator.simulation_speed = 1.0
+        mock_simulator.paused = False
+
+        ui = SimulationUI(mock_simulator)
+        ui.ui_text.setText = Mock()
+
+        ui.update_ui_text()
+        ui.update_ui_text()
+        assert ui.ui_text.setText.call_count == 1
+
+        # Changes below the displayed precision don't re-render
+        mock_simulator.simulation_time = 1.001
+        ui.update_ui_text()
+        assert ui.ui_text.setText.call_count == 1
+
+        mock_simulator.simulation_time = 1.01
+        ui.update_ui_text()
+        assert ui.ui_text.setText.call_count == 2
+
+        mock_simulator.paused = True
+        ui.update_ui_text()
+        assert ui.ui_text.setText.call_count == 3
+
     def test_increase_speed_within_limits(self):
         """Test speed increase within limits."""
         from simulation_ui import SimulationUI
@@ -220,6 +256,9 @@ class TestSimulationUI:
             mock_simulator.create_initial_particles.assert_called_once()
             mock_update_text.assert_called_once()
 
+            # Same-sized respawns still rebuild every batch
+            mock_simulator.batcher.mark_dirty.assert_called_once_with()
+
     def test_toggle_pause_from_running(self):
         """Test pause toggle from running state."""
         from simulation_ui import SimulationUI
@@ -250,4 +289,55 @@ class TestSimulationUI:
             ui.toggle_pause()
 
             assert mock_simulator.paused == False
-            mock_update_text.assert_called_once()
\ No newline at end of file
+            mock_update_text.assert_called_once()
+
+    def test_actions_reported_to_on_event(self):
+        """Test that each user action is reported after it is applied."""
+        from simulation_ui import SimulationUI
+
+        mock_simulator = Mock()
+        mock_simulator.taskMgr = Mock()
+        mock_simulator.paused = False
+        mock_simulator.simulation_speed = 5.0
+        mock_simulator.max_speed = 10.0
+        mock_simulator.min_speed = 0.1
+        mock_simulator.speed_increment = 1.0
+        mock_simulator.particles = []
+
+        ui = SimulationUI(mock_simulator)
+        ui.on_event = Mock(side_effect=lambda name: seen.append((name, mock_simulator.paused)))
+        seen = []
+
+        with patch.object(ui, 'update_ui_text'):
+            ui.toggle_pause()
+            ui.increase_speed()
+            ui.decrease_speed()
+            ui.reset_simulation()
+
+        assert seen == [("toggle_pause", True), ("increase_speed", True),
+                        ("decrease_speed", True), ("reset_simulation", False)]
+
+    def test_actions_forwarded_to_command_sink(self):
+        """Test that a viewer sends user actions on instead of applying them."""
+        from simulation_ui import SimulationUI
+
+        mock_simulator = Mock()
+        mock_simulator.taskMgr = Mock()
+        mock_simulator.paused = False
+        mock_simulator.simulation_speed = 5.0
+
+        ui = SimulationUI(mock_simulator)
+        ui.command_sink = Mock()
+        ui.on_event = Mock()
+
+        ui.toggle_pause()
+        ui.increase_speed()
+        ui.decrease_speed()
+        ui.reset_simulation()
+
+        assert [call.args[0] for call in ui.command_sink.call_args_list] == [
+            "toggle_pause", "increase_speed", "decrease_speed", "reset_simulation"]
+        assert mock_simulator.paused == False
+        assert mock_simulator.simulation_speed == 5.0
+        mock_simulator.create_initial_particles.assert_not_called()
+        ui.on_event.assert_not_called()
@@ -0,0 +1,161 @@
+import numpy as np
+import pytest
+from types import SimpleNamespace
+from unittest.mock import Mock
+from panda3d.core import NodePath
+
+
+class TestColormap:
+    """Test cases for the precomputed colormap lookup table."""
+
+    def test_build_colormap_interpolates_stops(self):
+        """Test that the table starts and ends on the outer stops."""
+        from temperature import build_colormap
+
+        lut = build_colormap(((0.0, (0.0, 0.0, 0.0)), (1.0, (1.0, 0.5, 0.0))), size=3)
+        assert lut.shape == (3, 4)
+        assert lut.dtype == np.uint8
+        assert lut.tolist() == [[0, 0, 0, 255], [128, 64, 0, 255], [255, 128, 0, 255]]
+
+
+class TestTemperatureModel:
+    """Test cases for the TemperatureModel class."""
+
+    def test_temperature_falls_with_time_and_distance(self):
+        """Test that particles cool as the universe and their neighbourhood expand."""
+        from temperature import TemperatureModel
+
+        model = TemperatureModel(initial_temperature=1000.0, expansion_timescale=10.0,
+                                 cooling_length=2.0)
+        assert model.temperatures(0.0, [0.0])[0] == pytest.approx(1000.0)
+        assert model.temperatures(10.0, [0.0])[0] == pytest.approx(500.0)
+        assert model.temperatures(0.0, [2.0])[0] == pytest.approx(500.0)
+        assert model.temperatures(10.0, [2.0])[0] == pytest.approx(250.0)
+
+    def test_colors_span_the_colormap(self):
+        """Test that the hottest and coldest temperatures map to the ends of the table."""
+        from temperature import TemperatureModel
+
+        model = TemperatureModel(initial_temperature=1000.0, min_temperature=1.0)
+        colors = model.colors(np.array([1000.0, 1.0, 0.01, 1e6]))
+        assert colors.shape == (4, 4)
+        assert colors[0].tolist() == model.colormap[-1].tolist()
+        assert colors[1].tolist() == model.colormap[0].tolist()
+        # Out of range temperatures are clamped
+        assert colors[2].tolist() == model.colormap[0].tolist()
+        assert colors[3].tolist() == model.colormap[-1].tolist()
+
+    def test_colors_for_is_vectorized(self):
+        """Test that one call colors every particle."""
+        from temperature import TemperatureModel
+
+        model = TemperatureModel()
+        colors = model.colors_for(5.0, np.linspace(0.0, 50.0, 1000))
+        assert colors.shape == (1000, 4)
+
+
+@pytest.fixture
+def simulator(make_simulator):
+    """A CPU-path simulator stand-in ten simulation seconds into the run."""
+    simulator = make_simulator(("type1",), gpu=False)
+    simulator.simulation_time = 10.0
+    simulator.expansion_rate = 0.5
+    simulator.batcher.staging = {"type1": NodePath("staging")}
+    return simulator
+
+
+class TestTemperatureColorizer:
+    """Test cases for the TemperatureColorizer class."""
+
+    def test_initialization(self, simulator):
+        """Test that the colorizer hooks batch rebuilds and registers its task."""
+        from temperature import TemperatureColorizer
+
+        colorizer = TemperatureColorizer(simulator)
+
+        assert simulator.batcher.on_collect == colorizer.on_collect
+        simulator.taskMgr.doMethodLater.assert_called_once_with(
+            colorizer.refresh_interval, colorizer.update_temperature_task, "update_temperature_task")
+
+    def test_cpu_refresh_writes_batch_colors(self, simulator):
+        """Test that each batch chunk gets one color per particle from its spawn time."""
+        from scene_batching import BatchChunk
+        from temperature import TemperatureColorizer
+
+        colorizer = TemperatureColorizer(simulator)
+        particles = [NodePath("a"), NodePath("b")]
+        particles[0].setPythonTag("spawn_time", 10.0)
+        particles[1].setPythonTag("spawn_time", 2.0)
+        chunk = BatchChunk(NodePath("type1"), "type1", 0)
+        chunk.particles = particles
+        colorizer.on_collect(chunk)
+
+        colorizer.refresh()
+
+        colored_chunk, colors = simulator.batcher.set_chunk_colors.call_args[0]
+        assert colored_chunk is chunk
+        expected = colorizer.model.colors_for(10.0, np.array([0.0, 4.0]))
+        assert colors.tolist() == expected.tolist()
+        assert simulator.batcher.staging["type1"].hasColor()
+
+    def test_rebuilt_batch_recolored_immediately(self, simulator, make_batcher):
+        """Test that every rebuild writes temperature colors into the new geometry."""
+        from panda3d.core import GeomVertexReader, LineSegs
+        from temperature import TemperatureColorizer
+
+        simulator.batcher, render, task_mgr = make_batcher()
+        colorizer = TemperatureColorizer(simulator)
+
+        def spawn(spawn_time):
+            lines = LineSegs()
+            lines.moveTo(0, 0, 0)
+            lines.drawTo(0, 1, 0)
+            particle = simulator.batcher.add_particle("type1")
+            particle.attachNewNode(lines.create())
+            particle.setX(spawn_time)  # Untransformed particles would be flattened away
+            particle.setPythonTag("spawn_time", spawn_time)
+
+        spawn(10.0)
+        simulator.batcher.collect()
+        spawn(2.0)
+        simulator.batcher.collect()
+
+        internal = simulator.batcher.chunks["type1"][0].np.node().getInternalScene()
+        vdata = internal.node().getGeom(0).getVertexData()
+        assert vdata.hasColumn("color")
+        reader = GeomVertexReader(vdata, "color")
+        vertex_colors = set()
+        while not reader.isAtEnd():
+            vertex_colors.add(tuple(round(c * 255) for c in reader.getData4()))
+        expected = colorizer.model.colors_for(10.0, np.array([0.0, 4.0]))
+        assert vertex_colors == {tuple(color) for color in expected.tolist()}
+
+    def test_gpu_refresh_sets_pool_colors(self, simulator):
+        """Test that each GPU pool gets colors from its current positions."""
+        from temperature import TemperatureColorizer
+
+        pool = Mock()
+        pool.count = 2
+        pool.current_positions.return_value = np.array([[3.0, 4.0, 0.0], [0.0, 0.0, 1.0]])
+        simulator.gpu_particles = SimpleNamespace(pools={"type1": pool})
+        colorizer = TemperatureColorizer(simulator)
+
+        colorizer.refresh()
+
+        colors = pool.set_colors.call_args[0][0]
+        expected = colorizer.model.colors_for(10.0, np.array([5.0, 1.0]))
+        assert colors.tolist() == expected.tolist()
+        assert pool.spawn_color.tolist() == colorizer.model.colors_for(10.0, [0.0])[0].tolist()
+        simulator.batcher.set_chunk_colors.assert_not_called()
+
+    def test_update_task_reschedules(self, simulator):
+        """Test that the task recolors and asks to run again after its interval."""
+        from temperature import TemperatureColorizer
+
+        colorizer = TemperatureColorizer(simulator)
+        colorizer.refresh = Mock()
+        task = Mock()
+        task.again = "again"
+
+        assert colorizer.update_temperature_task(task) == "again"
+        colorizer.refresh.assert_called_once_with()